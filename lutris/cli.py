@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""Commands run from the command line, without the GUI.
+
+Only pga is imported up front, the config and runners modules are imported
+by the commands needing them so scripts calling lutris stay fast.
+"""
+import os
+import json
+
+from lutris import pga
+
+# Columns of the games listed by the command line
+GAME_COLUMNS = ['id', 'name', 'slug', 'runner', 'platform', 'year',
+                'directory', 'installed', 'installer_slug', 'steamid',
+                'lastplayed']
+
+
+def _row_to_dict(row):
+    return dict(zip(row.keys(), row))
+
+
+def list_games(installed=False, runner=None, columns=None):
+    """Return the games of the library as a list of dicts."""
+    where = {}
+    if installed:
+        where['installed'] = 1
+    if runner:
+        where['runner'] = runner
+    return [_row_to_dict(row)
+            for row in pga.iter_games(columns=columns or GAME_COLUMNS,
+                                      where=where or None)]
+
+
+def search_games(query, limit=None):
+    """Return the games matching query, best matches first."""
+    games = []
+    for slug in pga.search_games(query, limit=limit):
+        game = pga.get_game_by_slug(slug)
+        if game:
+            games.append(dict((column, game.get(column))
+                              for column in GAME_COLUMNS))
+    return games
+
+
+def get_game(game_ref):
+    """Return the game a lutris: URI refers to, by slug or installer slug."""
+    return (pga.get_game_by_slug(game_ref) or
+            pga.get_game_by_slug(game_ref, field='installer_slug'))
+
+
+def list_steam_games():
+    """Return the appids of the games of the Wine Steam account."""
+    from lutris.runners import winesteam
+    return winesteam.winesteam().get_appid_list() or []
+
+
+def read_installer(filename):
+    """Return the installer scripts found in a YAML file.
+
+    Raise ValueError if the file doesn't contain any valid script.
+    """
+    import yaml
+    with open(filename, 'r') as installer_file:
+        try:
+            scripts = yaml.safe_load(installer_file.read())
+        except yaml.YAMLError as ex:
+            raise ValueError("Invalid YAML in %s: %s" % (filename, ex))
+    if not scripts:
+        raise ValueError("No installer in %s" % filename)
+    if not isinstance(scripts, list):
+        scripts = [scripts]
+    for script in scripts:
+        if not isinstance(script, dict):
+            raise ValueError("Invalid installer in %s" % filename)
+        for field in ('runner', 'name', 'game_slug'):
+            if not script.get(field):
+                raise ValueError("Missing field '%s' in %s"
+                                 % (field, filename))
+    return scripts
+
+
+def sync_library():
+    """Sync the library with lutris.net and Steam.
+
+    Return the slugs of the changed games, sorted, by kind of change.
+    """
+    from lutris.sync import Sync
+    added, updated, installed, uninstalled = Sync().sync_all()
+    return {
+        'added': sorted(added),
+        'updated': sorted(updated),
+        'installed': sorted(installed),
+        'uninstalled': sorted(uninstalled),
+    }
+
+
+def export_library(with_config=True):
+    """Return the games of the library along with their configuration."""
+    from lutris import config, settings
+    games = list_games()
+    if with_config:
+        for game in games:
+            config_path = os.path.join(settings.CONFIG_DIR,
+                                       "games/%s.yml" % game['slug'])
+            game['config'] = config.read_config_file(config_path)
+    return {'version': settings.VERSION, 'games': games}
+
+
+def dump_json(data):
+    return json.dumps(data, indent=2, sort_keys=True)
+
+
+def format_games(games):
+    """Format games as the table printed by --list-games."""
+    return u"\n".join(
+        u"{:<40} | {:<40} | {:<15} | {:<64}".format(
+            game['name'][:40],
+            game['slug'][:40],
+            game['runner'] or '-',
+            game['directory'] or '-'
+        ) for game in games
+    )
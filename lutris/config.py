@@ -19,13 +19,17 @@ import os
 import sys
 import yaml
 import logging
+from collections import MutableMapping
 from os.path import join
 
 from gi.repository import Gio
 
-from lutris import pga, settings, sysoptions
+from lutris import configstore, pga, settings, sysoptions
 from lutris.runners import import_runner
+from lutris.util import sql
 from lutris.util.log import logger
+from lutris.util.persistence import WRITER, write_atomic
+from lutris.util.startup import PROFILER
 
 
 def register_handler():
@@ -59,36 +63,238 @@ def check_config(force_wipe=False):
                    settings.RUNTIME_DIR,
                    settings.CACHE_DIR,
                    join(settings.CACHE_DIR, "installer"),
-                   join(settings.CACHE_DIR, "tmp")]
+                   join(settings.CACHE_DIR, "tmp"),
+                   settings.THUMBNAIL_PATH]
     for directory in directories:
         if not os.path.exists(directory):
             logger.debug("creating directory %s" % directory)
             os.makedirs(directory)
 
     if force_wipe:
+        sql.close_connections(settings.PGA_DB)
         os.remove(settings.PGA_DB)
-    pga.syncdb()
+    with PROFILER.phase('syncdb'):
+        pga.syncdb()
+        if configstore.is_enabled():
+            configstore.syncdb()
+
+
+# Use the faster libyaml parser when PyYAML was built with it
+YamlLoader = getattr(yaml, 'CLoader', yaml.Loader)
+
+# Parsed config files, keyed by path, with the stat info they were read with
+_yaml_cache = {}
+
+
+def _get_file_signature(filename):
+    """Return what identifies a version of a file: mtime, size and inode."""
+    stat = os.stat(filename)
+    return (stat.st_mtime, stat.st_size, stat.st_ino)
+
+
+def _copy_config(config):
+    """Copy the dicts and lists of a parsed config, leaving values shared."""
+    if isinstance(config, dict):
+        return dict((key, _copy_config(value))
+                    for key, value in config.iteritems())
+    if isinstance(config, list):
+        return [_copy_config(value) for value in config]
+    return config
 
 
 def read_yaml_from_file(filename):
-    """Read filename and return parsed yaml"""
+    """Read filename and return parsed yaml
+
+    Files are only parsed again when they changed on disk, callers get their
+    own copy of the content and are free to modify it.
+    """
     if not filename or not os.path.exists(filename):
         return {}
+    signature = _get_file_signature(filename)
+    cached = _yaml_cache.get(filename)
+    if cached and cached[0] == signature:
+        return _copy_config(cached[1])
     try:
-        content = file(filename, 'r').read()
-        yaml_content = yaml.load(content) or {}
+        with open(filename, 'r') as yaml_file:
+            yaml_content = yaml.load(yaml_file, Loader=YamlLoader) or {}
     except (yaml.scanner.ScannerError, yaml.parser.ParserError):
         logger.error("error parsing file %s", filename)
         yaml_content = {}
-    return yaml_content
+    _yaml_cache[filename] = (signature, yaml_content)
+    return _copy_config(yaml_content)
+
 
+def dump_yaml(config, safe=False):
+    dump = yaml.safe_dump if safe else yaml.dump
+    return dump(config, default_flow_style=False)
 
-def write_yaml_to_file(filepath, config):
+
+def write_yaml_to_file(filepath, config, safe=False):
+    if not filepath:
+        raise ValueError('Missing filepath')
+    WRITER.cancel(filepath)
+    write_atomic(filepath, dump_yaml(config, safe=safe))
+    _yaml_cache.pop(filepath, None)
+
+
+def read_config_file(filepath):
+    """Read a config level from the config store when it is enabled.
+
+    Levels that aren't in the store yet are read from their YAML file.
+    """
+    pending = WRITER.get_pending(filepath)
+    if pending is not None:
+        return _copy_config(pending)
+    if filepath and configstore.is_enabled():
+        content = configstore.read_config(filepath)
+        if content is not None:
+            return content
+    return read_yaml_from_file(filepath)
+
+
+def write_config_file(filepath, config, safe=False):
+    """Write a config level to the config store when it is enabled, to its
+    YAML file otherwise or when the store can't hold it.
+
+    YAML files are written in the background once the config stopped
+    changing, reading them back in the meantime returns the new content.
+    """
     if not filepath:
         raise ValueError('Missing filepath')
-    yaml_config = yaml.dump(config, default_flow_style=False)
-    with open(filepath, "w") as filehandler:
-        filehandler.write(yaml_config)
+    if configstore.is_enabled():
+        try:
+            configstore.write_config(filepath, config)
+            return
+        except ValueError as ex:
+            # Configs the store can't hold are kept in their YAML file
+            logger.warning("Can't store %s, writing it as YAML: %s",
+                           filepath, ex)
+            if configstore.has_config(filepath):
+                configstore.delete_config(filepath)
+    WRITER.schedule(filepath, _copy_config(config),
+                    lambda content: dump_yaml(content, safe=safe))
+
+
+def config_file_exists(filepath):
+    if WRITER.is_pending(filepath):
+        return True
+    if configstore.is_enabled() and configstore.has_config(filepath):
+        return True
+    return os.path.exists(filepath)
+
+
+def remove_config_file(filepath):
+    """Remove a config level from the store and from disk.
+
+    Return False if it didn't exist.
+    """
+    exists = WRITER.is_pending(filepath)
+    WRITER.cancel(filepath)
+    if configstore.is_enabled() and configstore.has_config(filepath):
+        configstore.delete_config(filepath)
+        exists = True
+    if os.path.exists(filepath):
+        os.remove(filepath)
+        _yaml_cache.pop(filepath, None)
+        exists = True
+    return exists
+
+
+def _iter_config_files(config_dir):
+    """Yield the paths of the YAML config files found in config_dir."""
+    system_path = join(config_dir, 'system.yml')
+    if os.path.exists(system_path):
+        yield system_path
+    for dirname in sorted(configstore.LEVEL_DIRS):
+        level_dir = join(config_dir, dirname)
+        if not os.path.isdir(level_dir):
+            continue
+        for filename in sorted(os.listdir(level_dir)):
+            if filename.endswith('.yml'):
+                yield join(level_dir, filename)
+
+
+def import_config_store():
+    """Copy the YAML config files into the config store.
+
+    Files that can't be stored without changes are left out and reported.
+    Return the number of imported files.
+    """
+    WRITER.flush()
+    configstore.syncdb()
+    imported = 0
+    for filepath in _iter_config_files(configstore.CONFIG_DIR):
+        content = read_yaml_from_file(filepath)
+        try:
+            configstore.write_config(filepath, content)
+        except ValueError as ex:
+            logger.error("Can't import %s to the config store: %s",
+                         filepath, ex)
+            continue
+        imported += 1
+    return imported
+
+
+def export_config_store():
+    """Write the configs of the config store back to their YAML files.
+
+    Return the number of exported files.
+    """
+    configstore.syncdb()
+    configs = configstore.get_configs()
+    for key, content in configs.iteritems():
+        filepath = join(configstore.CONFIG_DIR, key)
+        dirname = os.path.dirname(filepath)
+        if not os.path.exists(dirname):
+            os.makedirs(dirname)
+        write_yaml_to_file(filepath, content, safe=True)
+    return len(configs)
+
+
+class LayeredConfig(MutableMapping):
+    """Read-through view of several config levels, resolved on access.
+
+    The layers are (level name, dict) pairs, from the highest precedence to
+    the lowest. They are not copied, changes made to them are seen right away.
+    Writes go to the first layer.
+    """
+    def __init__(self, layers=None):
+        self.layers = layers or [(None, {})]
+
+    def __getitem__(self, key):
+        for _level, layer in self.layers:
+            if key in layer:
+                return layer[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        self.layers[0][1][key] = value
+
+    def __delitem__(self, key):
+        del self.layers[0][1][key]
+
+    def __contains__(self, key):
+        return any(key in layer for _level, layer in self.layers)
+
+    def __iter__(self):
+        seen = set()
+        for _level, layer in self.layers:
+            for key in layer:
+                if key not in seen:
+                    seen.add(key)
+                    yield key
+
+    def __len__(self):
+        return len(set().union(*[layer for _level, layer in self.layers]))
+
+    def __repr__(self):
+        return repr(dict(self.iteritems()))
+
+    def get_level(self, key):
+        """Return the name of the level the value of `key` comes from."""
+        for level, layer in self.layers:
+            if key in layer:
+                return level
 
 
 class LutrisConfig(object):
@@ -124,13 +330,17 @@ class LutrisConfig(object):
     - For system level, pass nothing
     If need be, you can pass the level manually.
 
-    To read, use the config sections dicts: game_config, runner_config and
-    system_config.
+    To read, use the config sections: game_config, runner_config and
+    system_config. They are views resolving each option through the levels
+    when it is accessed.
 
     To write, modify the relevant `raw_XXXX_config` section dict, then run
     `save()`.
 
     """
+    # Options and defaults of each runner, see `get_option_registry`
+    _option_registry = {}
+
     def __init__(self, runner_slug=None, game_slug=None, level=None):
         self.game_slug = game_slug
         self.runner_slug = runner_slug
@@ -138,9 +348,9 @@ class LutrisConfig(object):
             self.runner_slug = pga.get_game_by_slug(game_slug).get('runner')
 
         # Cascaded config sections (for reading)
-        self.game_config = {}
-        self.runner_config = {}
-        self.system_config = {}
+        self.game_config = LayeredConfig()
+        self.runner_config = LayeredConfig()
+        self.system_config = LayeredConfig()
 
         # Raw (non-cascaded) sections (for writing)
         self.raw_game_config = {}
@@ -163,9 +373,9 @@ class LutrisConfig(object):
         self.game_level = {'system': {}, self.runner_slug: {}, 'game': {}}
         self.runner_level = {'system': {}, self.runner_slug: {}}
         self.system_level = {'system': {}}
-        self.game_level.update(read_yaml_from_file(self.game_config_path))
-        self.runner_level.update(read_yaml_from_file(self.runner_config_path))
-        self.system_level.update(read_yaml_from_file(self.system_config_path))
+        self.game_level.update(read_config_file(self.game_config_path))
+        self.runner_level.update(read_config_file(self.runner_config_path))
+        self.system_level.update(read_config_file(self.system_config_path))
 
         self.update_cascaded_config()
         self.update_raw_config()
@@ -189,21 +399,21 @@ class LutrisConfig(object):
                             self.game_slug)
 
     def update_cascaded_config(self):
+        """Set the levels making up the cascaded config sections."""
+        defaults = self.get_option_registry(self.runner_slug)['defaults']
         if self.system_level.get('system') is None:
             self.system_level['system'] = {}
-        self.system_config.clear()
-        self.system_config.update(self.get_defaults('system'))
-        self.system_config.update(self.system_level.get('system'))
+        system_layers = [('system', self.system_level['system']),
+                         ('default', defaults['system'])]
 
         if self.level in ['runner', 'game'] and self.runner_slug:
             if self.runner_level.get(self.runner_slug) is None:
                 self.runner_level[self.runner_slug] = {}
             if self.runner_level.get('system') is None:
                 self.runner_level['system'] = {}
-            self.runner_config.clear()
-            self.runner_config.update(self.get_defaults('runner'))
-            self.runner_config.update(self.runner_level.get(self.runner_slug))
-            self.system_config.update(self.runner_level.get('system'))
+            runner_layers = [('runner', self.runner_level[self.runner_slug]),
+                             ('default', defaults['runner'])]
+            system_layers.insert(0, ('runner', self.runner_level['system']))
 
         if self.level == 'game' and self.runner_slug:
             if self.game_level.get('game') is None:
@@ -212,11 +422,15 @@ class LutrisConfig(object):
                 self.game_level[self.runner_slug] = {}
             if self.game_level.get('system') is None:
                 self.game_level['system'] = {}
-            self.game_config.clear()
-            self.game_config.update(self.get_defaults('game'))
-            self.game_config.update(self.game_level.get('game'))
-            self.runner_config.update(self.game_level.get(self.runner_slug))
-            self.system_config.update(self.game_level.get('system'))
+            self.game_config.layers = [('game', self.game_level['game']),
+                                       ('default', defaults['game'])]
+            runner_layers.insert(0, ('game',
+                                     self.game_level[self.runner_slug]))
+            system_layers.insert(0, ('game', self.game_level['system']))
+
+        if self.level in ['runner', 'game'] and self.runner_slug:
+            self.runner_config.layers = runner_layers
+        self.system_config.layers = system_layers
 
     def update_raw_config(self):
         # Select the right level of config
@@ -241,9 +455,7 @@ class LutrisConfig(object):
         if game is None:
             game = self.game_slug
         logging.debug("removing config for %s", game)
-        if os.path.exists(self.game_config_path):
-            os.remove(self.game_config_path)
-        else:
+        if not remove_config_file(self.game_config_path):
             logger.debug("No config file at %s" % self.game_config_path)
 
     def save(self):
@@ -259,30 +471,46 @@ class LutrisConfig(object):
             config_path = self.game_config_path
         else:
             raise ValueError("Invalid config level '%s'" % self.level)
-        write_yaml_to_file(config_path, config)
+        write_config_file(config_path, config)
         self.update_cascaded_config()
 
     def get_defaults(self, options_type):
         """Return a dict of options' default value."""
-        options_dict = self.options_as_dict(options_type)
-        defaults = {}
-        for option, params in options_dict.iteritems():
-            if 'default' in params:
-                defaults[option] = params['default']
-        return defaults
+        return dict(self.get_option_registry(self.runner_slug)['defaults']
+                    [options_type])
 
     def options_as_dict(self, options_type):
         """Convert the option list to a dict with option name as keys"""
-        options = {}
-        runner = (import_runner(self.runner_slug)()
-                  if self.runner_slug
-                  else None)
-        if options_type == 'system':
-            options = (sysoptions.with_runner_overrides(runner)
+        return dict(self.get_option_registry(self.runner_slug)['options']
+                    [options_type])
+
+    @classmethod
+    def get_option_registry(cls, runner_slug):
+        """Return the options and their defaults for a runner, by type.
+
+        They are computed once per runner and shared by all instances.
+        """
+        registry = cls._option_registry.get(runner_slug)
+        if registry:
+            return registry
+        runner = import_runner(runner_slug)() if runner_slug else None
+        options = {
+            'system': (sysoptions.with_runner_overrides(runner)
                        if runner
-                       else sysoptions.system_options)
-        elif options_type == 'runner' and runner:
-            options = runner.runner_options
-        elif options_type == 'game' and runner:
-            options = runner.game_options
-        return dict((opt['option'], opt) for opt in options)
+                       else sysoptions.system_options),
+            'runner': runner.runner_options if runner else [],
+            'game': runner.game_options if runner else [],
+        }
+        registry = {'options': {}, 'defaults': {}}
+        for options_type, option_list in options.iteritems():
+            options_dict = dict((opt['option'], opt) for opt in option_list)
+            registry['options'][options_type] = options_dict
+            registry['defaults'][options_type] = dict(
+                (option, params['default'])
+                for option, params in options_dict.iteritems()
+                # Defaults given by a provider are left to the code using
+                # the option, to avoid running commands for each config.
+                if 'default' in params and not callable(params['default'])
+            )
+        cls._option_registry[runner_slug] = registry
+        return registry
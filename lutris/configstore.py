@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""Optional SQLite storage of the system, runner and game configs.
+
+Each config level is stored as JSON under the path of its YAML file relative
+to CONFIG_DIR (``system.yml``, ``runners/wine.yml``, ``games/quake.yml``), and
+its options are indexed so tools can query all the games at once.
+It is enabled by setting ``config_store = sqlite`` in lutris.conf.
+"""
+
+import os
+import json
+
+from lutris import settings
+from lutris.util import sql
+
+CONFIG_DB = settings.CONFIG_DB
+CONFIG_DIR = settings.CONFIG_DIR
+
+LEVEL_DIRS = {'runners': 'runner', 'games': 'game'}
+
+
+def is_enabled():
+    """Whether the configs are read from and written to the store."""
+    return settings.read_setting('config_store') == 'sqlite'
+
+
+def syncdb():
+    """Create the tables of the config store if they don't exist."""
+    with sql.db_transaction(CONFIG_DB) as cursor:
+        cursor.execute(
+            "CREATE TABLE IF NOT EXISTS configs ("
+            "path TEXT PRIMARY KEY, level TEXT, name TEXT, content TEXT)"
+        )
+        cursor.execute("CREATE INDEX IF NOT EXISTS configs_level "
+                       "ON configs (level, name)")
+        cursor.execute(
+            "CREATE TABLE IF NOT EXISTS config_values ("
+            "path TEXT, level TEXT, name TEXT, section TEXT, option TEXT, "
+            "value TEXT)"
+        )
+        cursor.execute("CREATE INDEX IF NOT EXISTS config_values_option "
+                       "ON config_values (section, option, value)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS config_values_path "
+                       "ON config_values (path)")
+
+
+def get_key(path):
+    """Return the (key, level, name) a config file is stored under."""
+    key = os.path.relpath(os.path.abspath(path), CONFIG_DIR)
+    if key.startswith(os.pardir) or not key.endswith('.yml'):
+        raise ValueError("%s is not a config file of %s" % (path, CONFIG_DIR))
+    dirname, filename = os.path.split(key)
+    name = filename[:-len('.yml')]
+    if not dirname:
+        return key, name, name
+    if dirname not in LEVEL_DIRS:
+        raise ValueError("%s is not a config file of %s" % (path, CONFIG_DIR))
+    return key, LEVEL_DIRS[dirname], name
+
+
+def _decode(value):
+    """Turn the unicode strings of decoded JSON into what PyYAML returns:
+    str for ASCII text, unicode otherwise."""
+    if isinstance(value, unicode):
+        try:
+            return value.encode('ascii')
+        except UnicodeEncodeError:
+            return value
+    if isinstance(value, dict):
+        return dict((_decode(key), _decode(item))
+                    for key, item in value.iteritems())
+    if isinstance(value, list):
+        return [_decode(item) for item in value]
+    return value
+
+
+def _dumps(value):
+    return json.dumps(value, sort_keys=True)
+
+
+def _loads(value):
+    return _decode(json.loads(value))
+
+
+def encode_config(config):
+    """Return config as JSON.
+
+    Raise ValueError if the config can't be read back as it is, for example
+    when it has dates or non string keys.
+    """
+    try:
+        content = _dumps(config)
+    except TypeError as ex:
+        raise ValueError(str(ex))
+    if _loads(content) != config:
+        raise ValueError("config can't be stored as JSON without changes")
+    return content
+
+
+def read_config(path):
+    """Return the config stored for path, None if there is none."""
+    key = get_key(path)[0]
+    with sql.db_cursor(CONFIG_DB) as cursor:
+        row = cursor.execute("SELECT content FROM configs WHERE path = ?",
+                             (key, )).fetchone()
+    if row is None:
+        return None
+    return _loads(row[0])
+
+
+def has_config(path):
+    key = get_key(path)[0]
+    with sql.db_cursor(CONFIG_DB) as cursor:
+        row = cursor.execute("SELECT 1 FROM configs WHERE path = ?",
+                             (key, )).fetchone()
+    return row is not None
+
+
+def write_config(path, config):
+    """Store config for path, replacing its previous content."""
+    key, level, name = get_key(path)
+    content = encode_config(config)
+    values = []
+    for section, options in config.iteritems():
+        if not isinstance(options, dict):
+            continue
+        for option, value in options.iteritems():
+            values.append((key, level, name, section, option, _dumps(value)))
+    with sql.db_transaction(CONFIG_DB) as cursor:
+        cursor.execute("INSERT OR REPLACE INTO configs "
+                       "(path, level, name, content) VALUES (?, ?, ?, ?)",
+                       (key, level, name, content))
+        cursor.execute("DELETE FROM config_values WHERE path = ?", (key, ))
+        cursor.executemany("INSERT INTO config_values "
+                           "(path, level, name, section, option, value) "
+                           "VALUES (?, ?, ?, ?, ?, ?)", values)
+
+
+def delete_config(path):
+    key = get_key(path)[0]
+    with sql.db_transaction(CONFIG_DB) as cursor:
+        cursor.execute("DELETE FROM configs WHERE path = ?", (key, ))
+        cursor.execute("DELETE FROM config_values WHERE path = ?", (key, ))
+
+
+def get_configs(level=None):
+    """Return the stored configs of a level as a dict keyed by name, or all
+    of them keyed by path relative to CONFIG_DIR."""
+    query = "SELECT path, name, content FROM configs"
+    params = ()
+    if level:
+        query += " WHERE level = ?"
+        params = (level, )
+    with sql.db_cursor(CONFIG_DB) as cursor:
+        return dict((name if level else key, _loads(content))
+                    for key, name, content in cursor.execute(query, params))
+
+
+def get_option_values(section, option, level='game'):
+    """Return the value of an option in all the configs of a level that set
+    it, as a dict keyed by config name."""
+    with sql.db_cursor(CONFIG_DB) as cursor:
+        rows = cursor.execute(
+            "SELECT name, value FROM config_values "
+            "WHERE section = ? AND option = ? AND level = ?",
+            (section, option, level)
+        )
+        return dict((name, _loads(value)) for name, value in rows)
+
+
+def find_configs(section, option, value, level='game'):
+    """Return the sorted names of the configs of a level where an option is
+    set to value."""
+    with sql.db_cursor(CONFIG_DB) as cursor:
+        rows = cursor.execute(
+            "SELECT name FROM config_values WHERE section = ? AND option = ? "
+            "AND value = ? AND level = ? ORDER BY name",
+            (section, option, _dumps(value), level)
+        )
+        return [row[0] for row in rows]
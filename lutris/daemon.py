@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""D-Bus service of the running Lutris instance.
+
+The service is owned by the main window, or by a resident daemon started
+with --daemon. The daemon has no window until one is requested, and keeps
+the library and config caches warm so desktop launchers start games
+right away. The games cache is checked against the database before each
+request, since other processes write to it.
+"""
+import os
+import json
+import time
+
+import dbus
+import dbus.service
+
+from lutris import cli, config, pga, settings
+from lutris.util.log import logger
+from lutris.util.persistence import WRITER
+from lutris.util.startup import PROFILER
+
+DBUS_INTERFACE = 'org.lutris.main'
+
+
+def warm_caches():
+    """Load what launching games and querying the library need."""
+    from lutris import sync
+    from lutris.runners import steam, winesteam
+    pga.GAME_CACHE.load()
+    games_config_dir = os.path.join(settings.CONFIG_DIR, 'games')
+    if os.path.isdir(games_config_dir):
+        for filename in os.listdir(games_config_dir):
+            if filename.endswith('.yml'):
+                config.read_config_file(os.path.join(games_config_dir,
+                                                     filename))
+    for runner_slug in pga.get_used_runners():
+        try:
+            config.LutrisConfig.get_option_registry(runner_slug)
+        except Exception as ex:  # Invalid runners shouldn't stop the daemon
+            logger.error("Can't load the options of %s: %s", runner_slug, ex)
+    for runner in (steam.steam(), winesteam.winesteam()):
+        sync.Sync._get_installed_steamapps(runner)
+
+
+class LutrisService(dbus.service.Object):
+    """D-Bus services to run Lutris."""
+    def __init__(self, bus, path, name):
+        dbus.service.Object.__init__(self, bus, path, name)
+        self.running = False
+        self.resident = False
+        self.lutris_window = None
+        self.games = {}
+        self.start_time = time.time()
+        # Called once the window has been drawn and its view filled
+        self.startup_callback = None
+
+    def open_window(self):
+        with PROFILER.phase('window_imports'):
+            from gi.repository import GLib
+            from lutris.gui.lutriswindow import LutrisWindow
+        with PROFILER.phase('window'):
+            self.lutris_window = LutrisWindow()
+        if self.startup_callback:
+            # Idle callbacks run once the window has been drawn
+            self.lutris_window.view.connect(
+                'view-filled',
+                lambda view, fill_time: GLib.idle_add(self.startup_callback)
+            )
+
+    def run_daemon(self):
+        """Serve requests without a window until stopped."""
+        from gi.repository import GObject, Gtk
+        self.resident = True
+        logger.info("Warming up caches")
+        warm_caches()
+        GObject.threads_init()
+        # Closing the window quits the main loop, the daemon keeps going
+        while self.resident:
+            Gtk.main()
+            self.lutris_window = None
+
+    @dbus.service.method(DBUS_INTERFACE, out_signature='b')
+    def is_running(self):
+        return self.running or self.resident
+
+    @dbus.service.method(DBUS_INTERFACE, in_signature='i')
+    def run(self, timestamp):
+        if self.lutris_window:
+            self.lutris_window.window.present_with_time(timestamp)
+        elif self.resident:
+            self.open_window()
+        else:
+            from gi.repository import GObject, Gtk
+            logger.info("Welcome to Lutris")
+            self.running = True
+            self.open_window()
+            GObject.threads_init()
+            Gtk.main()
+            self.running = False
+
+    @dbus.service.method(DBUS_INTERFACE, in_signature='s')
+    def install_game(self, game_ref):
+        pga.GAME_CACHE.revalidate()
+        if not self.lutris_window:
+            self.open_window()
+        self.lutris_window.on_install_clicked(game_ref=game_ref)
+
+    @dbus.service.method(DBUS_INTERFACE, in_signature='s')
+    def run_game(self, game_slug):
+        pga.GAME_CACHE.revalidate()
+        if self.lutris_window:
+            self.lutris_window.on_game_run(game_slug=game_slug)
+        else:
+            self.launch_game(game_slug)
+
+    @dbus.service.method(DBUS_INTERFACE, in_signature='s', out_signature='b')
+    def launch_game(self, game_slug):
+        """Launch an installed game without opening the window."""
+        pga.GAME_CACHE.revalidate()
+        from lutris.game import Game
+        game = Game(game_slug)
+        if not game.is_installed:
+            return False
+        if game.play() is False:
+            return False
+        self.games[game_slug] = game
+        return True
+
+    @dbus.service.method(DBUS_INTERFACE, in_signature='b', out_signature='s')
+    def get_games(self, installed):
+        """Return the games of the library as JSON."""
+        return cli.dump_json(cli.list_games(installed=installed))
+
+    @dbus.service.method(DBUS_INTERFACE, in_signature='s', out_signature='s')
+    def search_games(self, query):
+        pga.GAME_CACHE.revalidate()
+        return cli.dump_json(cli.search_games(query))
+
+    @dbus.service.method(DBUS_INTERFACE, in_signature='s', out_signature='s')
+    def get_game(self, game_ref):
+        pga.GAME_CACHE.revalidate()
+        return cli.dump_json(cli.get_game(game_ref))
+
+    @dbus.service.method(DBUS_INTERFACE, out_signature='s')
+    def get_running_games(self):
+        """Return the state of the games launched by this instance."""
+        games = dict(self.games)
+        if self.lutris_window and self.lutris_window.running_game:
+            game = self.lutris_window.running_game
+            games[game.slug] = game
+        status = []
+        for slug, game in sorted(games.iteritems()):
+            if game.state == game.STATE_STOPPED:
+                self.games.pop(slug, None)
+            thread = getattr(game, 'game_thread', None)
+            process = thread.game_process if thread else None
+            status.append({
+                'slug': slug,
+                'name': game.name,
+                'state': game.state,
+                'pid': process.pid if process else None,
+            })
+        return cli.dump_json(status)
+
+    @dbus.service.method(DBUS_INTERFACE, out_signature='s')
+    def get_stats(self):
+        return json.dumps({
+            'uptime': time.time() - self.start_time,
+            'resident': self.resident,
+            'window': bool(self.lutris_window),
+            'games_cache': pga.GAME_CACHE.get_stats(),
+            'config_writes': WRITER.get_stats(),
+        })
+
+    @dbus.service.method(DBUS_INTERFACE)
+    def quit(self):
+        """Stop the daemon, once its window is closed if it has one."""
+        from gi.repository import Gtk
+        self.resident = False
+        if not self.lutris_window:
+            Gtk.main_quit()
@@ -27,9 +27,14 @@ def show_error_message(message):
         dialogs.ErrorDialog("The file %s is not executable" % message['file'])
 
 
+# Columns of the games listed in the game views
+GAME_LIST_COLUMNS = ['slug', 'name', 'year', 'runner', 'installed']
+
+
 def get_game_list(filter_installed=False):
-    games = pga.get_games(filter_installed=filter_installed)
-    return [game['slug'] for game in games]
+    """Return the games shown in the game views, read with a single query."""
+    where = {'installed': 1} if filter_installed else None
+    return list(pga.iter_games(columns=GAME_LIST_COLUMNS, where=where))
 
 
 class Game(object):
@@ -177,8 +182,8 @@ class Game(object):
 
         terminal = system_config.get('terminal')
         if terminal:
-            terminal = system_config.get("terminal_app",
-                                         system.get_default_terminal())
+            terminal = (system_config.get("terminal_app") or
+                        system.get_default_terminal())
             if terminal and not system.find_executable(terminal):
                 dialogs.ErrorDialog("The selected terminal application "
                                     "could not be launched:\n"
@@ -58,8 +58,8 @@ class ConfigBox(VBox):
                 if config_section not in option['scope']:
                     continue
             option_key = option['option']
-            value = self.config.get(option_key)
-            default = option.get('default')
+            default = sysoptions.resolve(option, 'default')
+            value = self.config.get(option_key, default)
 
             hbox = Gtk.HBox()
             hbox.set_margin_left(20)
@@ -71,7 +71,6 @@ class ConfigBox(VBox):
             hbox.pack_end(placeholder, False, False, 5)
 
             # Set tooltip's "Default" part
-            default = option.get('default')
             self.tooltip_default = default if type(default) is str else None
 
             # Generate option widget
@@ -107,7 +106,7 @@ class ConfigBox(VBox):
                                      helptext)
 
             # Grey out option if condition unmet
-            if 'condition' in option and not option['condition']:
+            if not sysoptions.resolve(option, 'condition', True):
                 hbox.set_sensitive(False)
 
             # Hide if advanced
@@ -131,12 +130,12 @@ class ConfigBox(VBox):
 
         if option_type == 'choice':
             self.generate_combobox(option_key,
-                                   option["choices"],
+                                   sysoptions.resolve(option, "choices"),
                                    option["label"],
                                    value, default)
         elif option_type == 'choice_with_entry':
             self.generate_combobox(option_key,
-                                   option["choices"],
+                                   sysoptions.resolve(option, "choices"),
                                    option["label"],
                                    value, default, has_entry=True)
         elif option_type == 'bool':
@@ -455,7 +454,8 @@ class ConfigBox(VBox):
         self.raw_config.pop(option_key)
         self.lutris_config.update_cascaded_config()
 
-        reset_value = self.config.get(option_key)
+        default = sysoptions.resolve(option, 'default')
+        reset_value = self.config.get(option_key, default)
         if current_value == reset_value:
             return
 
@@ -464,8 +464,7 @@ class ConfigBox(VBox):
         children = wrapper.get_children()
         for child in children:
             child.destroy()
-        self.call_widget_generator(option, option_key, reset_value,
-                                   option.get('default'))
+        self.call_widget_generator(option, option_key, reset_value, default)
         self.wrapper.show_all()
 
     def set_style_property(self, property_, value, wrapper):
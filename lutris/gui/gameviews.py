@@ -1,5 +1,7 @@
 # -*- coding:Utf-8 -*-
 import os
+import time
+import threading
 
 from gi.repository import Gtk, GObject, Pango, GdkPixbuf, GLib
 from gi.repository.GdkPixbuf import Pixbuf
@@ -7,14 +9,22 @@ from gi.repository.GdkPixbuf import Pixbuf
 from lutris import pga, settings
 from lutris.config import LutrisConfig
 from lutris.gui.cellrenderers import GridViewCellRendererText
+from lutris.gui.imageloader import ImageLoader
+from lutris.gui.pixbufcache import PIXBUF_CACHE
 from lutris.runners import import_runner
 from lutris.shortcuts import desktop_launcher_exists, menu_launcher_exists
 from lutris.util import datapath
+from lutris.util.log import logger
+from lutris.util.strings import get_search_key, get_sort_key
 
 DEFAULT_BANNER = os.path.join(datapath.get(), 'media/default_banner.png')
 DEFAULT_ICON = os.path.join(datapath.get(), 'media/default_icon.png')
 UNAVAILABLE_GAME_OVERLAY = os.path.join(datapath.get(),
                                         'media/unavailable.png')
+# Screens of games, around the visible ones, whose images are loaded ahead
+PREFETCH_SCREENS = 1
+# Screens of games, around the visible ones, whose images are kept loaded
+KEPT_SCREENS = 3
 BANNER_SIZE = (184, 69)
 BANNER_SMALL_SIZE = (120, 45)
 ICON_SIZE = (32, 32)
@@ -25,23 +35,13 @@ ICON_SIZE = (32, 32)
     COL_YEAR,
     COL_RUNNER,
     COL_INSTALLED,
-) = range(6)
+    COL_SEARCH_KEY,
+    COL_SORT_KEY,
+) = range(8)
 
 
-def sort_func(store, a_iter, b_iter, _user_data):
-    """Default sort function."""
-    a_name = store.get(a_iter, COL_NAME)
-    b_name = store.get(b_iter, COL_NAME)
-
-    if a_name > b_name:
-        return 1
-    elif a_name < b_name:
-        return -1
-    else:
-        return 0
-
-
-def get_pixbuf_for_game(game_slug, icon_type="banner", is_installed=True):
+def get_icon_info(game_slug, icon_type):
+    """Return the path, default path and size of the image of a game."""
     if icon_type in ("banner", "banner_small"):
         size = BANNER_SIZE if icon_type == "banner" else BANNER_SMALL_SIZE
         default_icon = DEFAULT_BANNER
@@ -52,9 +52,79 @@ def get_pixbuf_for_game(game_slug, icon_type="banner", is_installed=True):
         default_icon = DEFAULT_ICON
         icon_path = os.path.join(settings.ICON_PATH,
                                  "lutris_%s.png" % game_slug)
+    return icon_path, default_icon, size
+
+
+def get_placeholder_pixbuf(icon_type="banner"):
+    """Return the pixbuf shown while the image of a game is loading."""
+    _icon_path, default_icon, size = get_icon_info(None, icon_type)
+    cache_key = (None, icon_type, True, os.path.getmtime(default_icon))
+    pixbuf = PIXBUF_CACHE.get(cache_key)
+    if pixbuf is None:
+        pixbuf = load_pixbuf(default_icon, default_icon, size, True)
+        PIXBUF_CACHE.set(cache_key, pixbuf)
+    return pixbuf
+
 
-    if not os.path.exists(icon_path):
+def get_pixbuf_for_game(game_slug, icon_type="banner", is_installed=True):
+    icon_path, default_icon, size = get_icon_info(game_slug, icon_type)
+    try:
+        mtime = os.path.getmtime(icon_path)
+    except OSError:
+        # Games without their own image share the pixbuf of the default one
+        game_slug = None
         icon_path = default_icon
+        mtime = os.path.getmtime(icon_path)
+    cache_key = (game_slug, icon_type, bool(is_installed), mtime)
+    pixbuf = PIXBUF_CACHE.get(cache_key)
+    if pixbuf is None:
+        if game_slug is None:
+            pixbuf = load_pixbuf(icon_path, default_icon, size, is_installed)
+        else:
+            pixbuf = get_thumbnail(game_slug, icon_type, is_installed,
+                                   icon_path, mtime)
+        PIXBUF_CACHE.set(cache_key, pixbuf)
+    return pixbuf
+
+
+def get_thumbnail_path(game_slug, icon_type, is_installed):
+    return os.path.join(settings.THUMBNAIL_PATH, icon_type, "%s.%s.png" % (
+        game_slug, 'installed' if is_installed else 'uninstalled'
+    ))
+
+
+def get_thumbnail(game_slug, icon_type, is_installed, icon_path, mtime):
+    """Return the image of a game, ready to be displayed, from the
+    thumbnail cache. The thumbnail is made again when the image changed.
+
+    Thumbnails have the modification time of the image they were made from.
+    """
+    thumbnail_path = get_thumbnail_path(game_slug, icon_type, is_installed)
+    try:
+        if abs(os.path.getmtime(thumbnail_path) - mtime) < 0.001:
+            return Pixbuf.new_from_file(thumbnail_path)
+    except (OSError, GLib.GError):
+        pass
+    _icon_path, default_icon, size = get_icon_info(game_slug, icon_type)
+    pixbuf = load_pixbuf(icon_path, default_icon, size, is_installed)
+    save_thumbnail(pixbuf, thumbnail_path, mtime)
+    return pixbuf
+
+
+def save_thumbnail(pixbuf, thumbnail_path, mtime):
+    thumbnail_dir = os.path.dirname(thumbnail_path)
+    tmp_path = "%s.%d.tmp" % (thumbnail_path, threading.current_thread().ident)
+    try:
+        if not os.path.isdir(thumbnail_dir):
+            os.makedirs(thumbnail_dir)
+        pixbuf.savev(tmp_path, 'png', [], [])
+        os.utime(tmp_path, (mtime, mtime))
+        os.rename(tmp_path, thumbnail_path)
+    except (OSError, GLib.GError) as ex:
+        logger.error("Failed to save thumbnail %s: %s", thumbnail_path, ex)
+
+
+def load_pixbuf(icon_path, default_icon, size, is_installed):
     try:
         pixbuf = Pixbuf.new_from_file_at_size(icon_path, size[0], size[1])
     except GLib.GError:
@@ -76,42 +146,108 @@ class GameStore(object):
 
     def __init__(self, filter_text='', filter_runner='',
                  icon_type=None):
+        self.search_query = ''
+        self.search_matches = None
         self.filter_text = filter_text
         self.filter_runner = filter_runner
         self.icon_type = icon_type
-        self.store = Gtk.ListStore(str, str, Pixbuf, str, str, bool)
-        self.store.set_default_sort_func(sort_func)
-        self.store.set_sort_column_id(-1, Gtk.SortType.ASCENDING)
+        self.ignore_articles = (
+            settings.read_setting('sort_ignore_articles') == 'True'
+        )
+        self.store = Gtk.ListStore(str, str, Pixbuf, str, str, bool, str,
+                                   str)
+        # References stay valid when the store is sorted or changed
+        self.row_references = {}
+        # Rows are sorted by GTK on the precomputed sort key
+        self.store.set_sort_column_id(COL_SORT_KEY, Gtk.SortType.ASCENDING)
         self.modelfilter = self.store.filter_new()
         self.modelfilter.set_visible_func(self.filter_view)
 
+    @property
+    def filter_text(self):
+        return self._filter_text
+
+    @filter_text.setter
+    def filter_text(self, value):
+        """Each word of the search must be found in the name or slug of the
+        game, case, accents and special characters being ignored.
+
+        When the search narrows down the previous one, only the games that
+        matched the previous search are checked.
+        """
+        self._filter_text = value
+        query = get_search_key(value or '')
+        if (self.search_matches is not None and self.search_query and
+                query.startswith(self.search_query)):
+            self.search_candidates = self.search_matches
+        else:
+            self.search_candidates = None
+        self.search_query = query
+        self.search_terms = query.split()
+        self.search_matches = set() if self.search_terms else None
+
     def filter_view(self, model, _iter, filter_data=None):
         """Filter the game list."""
-        name = model.get_value(_iter, COL_NAME)
-        runner = model.get_value(_iter, COL_RUNNER)
-        if self.filter_text:
-            name_matches = self.filter_text.lower() in name.lower()
-        else:
-            name_matches = True
-        if self.filter_runner:
-            runner_matches = self.filter_runner == runner
-        else:
-            runner_matches = True
-        return name_matches and runner_matches
+        slug, runner, search_key = model.get(_iter, COL_ID, COL_RUNNER,
+                                             COL_SEARCH_KEY)
+        if self.search_terms:
+            if (self.search_candidates is not None and
+                    slug not in self.search_candidates):
+                return False
+            for term in self.search_terms:
+                if term not in search_key:
+                    return False
+            self.search_matches.add(slug)
+        if self.filter_runner and self.filter_runner != runner:
+            return False
+        return True
 
     def add_game(self, game_slug):
-        """Add a game into the store."""
+        """Add a game into the store, showing a placeholder image.
+
+        Return the game added.
+        """
         if not game_slug:
             return
         game_data = pga.get_game_by_slug(game_slug)
-        pixbuf = get_pixbuf_for_game(game_data['slug'], self.icon_type,
-                                     is_installed=game_data['installed'])
-        name = game_data['name'].replace('&', "&amp;")
-        self.store.append(
-            (game_data['slug'], name, pixbuf, str(game_data['year']),
-             game_data['runner'], game_data['installed'])
+        self.insert_game(game_data)
+        return game_data
+
+    def insert_game(self, game, pixbuf=None):
+        """Add a game record, holding at least the columns of
+        GAME_LIST_COLUMNS, into the store."""
+        if pixbuf is None:
+            pixbuf = get_placeholder_pixbuf(self.icon_type)
+        name = game['name'].replace('&', "&amp;")
+        search_key = get_search_key(game['name'])
+        if search_key:
+            search_key += ' '
+        search_key += get_search_key(game['slug'])
+        row_iter = self.store.append(
+            (game['slug'], name, pixbuf, str(game['year']), game['runner'],
+             bool(game['installed']), search_key,
+             get_sort_key(game['name'], self.ignore_articles))
+        )
+        if self.search_candidates is not None:
+            self.search_candidates.add(game['slug'])
+        self.row_references[game['slug']] = Gtk.TreeRowReference.new(
+            self.store, self.store.get_path(row_iter)
         )
 
+    def get_row_by_slug(self, game_slug):
+        """Return the row of a game, None if it isn't in the store."""
+        reference = self.row_references.get(game_slug)
+        if not reference or not reference.valid():
+            return None
+        return self.store[reference.get_path()]
+
+    def remove_game(self, game_slug):
+        """Remove a game from the store."""
+        row = self.get_row_by_slug(game_slug)
+        self.row_references.pop(game_slug, None)
+        if row:
+            self.store.remove(row.iter)
+
 
 class GameView(object):
     __gsignals__ = {
@@ -119,35 +255,65 @@ class GameView(object):
         "game-activated": (GObject.SIGNAL_RUN_FIRST, None, ()),
         "game-installed": (GObject.SIGNAL_RUN_FIRST, None, (str,)),
         "filter-updated": (GObject.SIGNAL_RUN_FIRST, None, ()),
+        # Emitted with the time spent filling the store, in seconds
+        "view-filled": (GObject.SIGNAL_RUN_FIRST, None, (float,)),
     }
     selected_game = None
     current_path = None
     contextual_menu = None
+    images_update_pending = False
+    last_visible_start = 0
 
     def connect_signals(self):
         """Signal handlers common to all views"""
         self.connect('filter-updated', self.update_filter)
         self.connect('button-press-event', self.popup_contextual_menu)
+        # Scrolling, filtering or sorting the view redraws it
+        self.connect('draw', self.schedule_images_update)
+        self.connect('destroy', self.on_destroy)
+
+    def on_destroy(self, view):
+        self.image_loader.stop()
 
     def fill_store(self, games):
-        """Fill the model asynchronously and in steps."""
+        """Fill the model asynchronously and in steps.
+
+        :param list games: Game records, as returned by get_game_list
+        """
         loader = self._fill_store_generator(games)
         GLib.idle_add(loader.next)
 
-    def _fill_store_generator(self, games, step=100):
+    def _fill_store_generator(self, games, step=1000):
         """Generator to fill the model in steps."""
-        n = 0
-        self.freeze_child_notify()
-        for game_slug in games:
-            self.game_store.add_game(game_slug)
-
-            # Yield to GTK main loop once in a while
-            n += 1
-            if (n % step) == 0:
-                self.thaw_child_notify()
-                yield True
+        pixbuf = get_placeholder_pixbuf(self.icon_type)
+        fill_time = 0
+        for start in range(0, len(games), step):
+            step_start = time.time()
+            # The view is detached from an empty model while it is filled,
+            # so it doesn't process each inserted row
+            detach = not self.n_games
+            if detach:
+                self.set_model(None)
+            else:
                 self.freeze_child_notify()
-        self.thaw_child_notify()
+            for game in games[start:start + step]:
+                self.game_store.insert_game(game, pixbuf)
+            if detach:
+                self.set_model(self.model)
+            else:
+                self.thaw_child_notify()
+            step_time = time.time() - step_start
+            fill_time += step_time
+            logger.debug("Added %d games in %0.1f ms",
+                         min(step, len(games) - start), step_time * 1000)
+            self.schedule_images_update()
+            # Yield to GTK main loop once in a while
+            yield True
+        if games:
+            logger.debug("Filled the view with %d games in %0.1f ms "
+                         "(%0.1f ms per 1000 games)", len(games),
+                         fill_time * 1000, fill_time * 1000000 / len(games))
+        self.emit('view-filled', fill_time)
         yield False
 
     @property
@@ -155,24 +321,98 @@ class GameView(object):
         return len(self.game_store.store)
 
     def get_row_by_slug(self, game_slug):
-        game_row = None
-        for model_row in self.game_store.store:
-            if model_row[COL_ID] == game_slug:
-                game_row = model_row
-        return game_row
+        return self.game_store.get_row_by_slug(game_slug)
 
     def add_game(self, game_slug):
         self.game_store.add_game(game_slug)
+        self.schedule_images_update()
+
+    def schedule_images_update(self, *args):
+        """Update the images shown once the main loop is idle."""
+        if not self.images_update_pending:
+            self.images_update_pending = True
+            GLib.idle_add(self.update_images)
+
+    def get_visible_indices(self):
+        """Return the first and last index of the games shown in the
+        scrolled window, None if there is none."""
+        visible_range = self.get_visible_range()
+        if not visible_range or not visible_range[0]:
+            return None
+        start_path, end_path = visible_range[-2:]
+        return start_path.get_indices()[0], end_path.get_indices()[0]
+
+    def get_rows(self, model, start, end):
+        """Return the slug and installed state of the games between two
+        indices of model."""
+        rows = []
+        for index in range(max(start, 0),
+                           min(end, model.iter_n_children(None))):
+            row_iter = model.iter_nth_child(None, index)
+            rows.append(model.get(row_iter, COL_ID, COL_INSTALLED))
+        return rows
+
+    def update_images(self):
+        """Load the images of the games around the visible ones, and release
+        the images of the games far from them.
+
+        The images of the visible games are loaded first, then the ones
+        ahead in the scrolling direction.
+        """
+        self.images_update_pending = False
+        visible = self.get_visible_indices()
+        if self.image_loader.stopped or not visible:
+            return False
+        start, end = visible
+        end += 1
+        screen = end - start
+        direction = cmp(start, self.last_visible_start)
+        self.last_visible_start = start
+        ahead = screen * (PREFETCH_SCREENS + 1)
+        model = self.get_model()
+        rows = self.get_rows(model, start, end)
+        if direction < 0:
+            rows += self.get_rows(model, start - ahead, start)[::-1]
+            rows += self.get_rows(model, end, end + screen * PREFETCH_SCREENS)
+        else:
+            rows += self.get_rows(model, end, end + ahead)
+            rows += self.get_rows(model, start - screen * PREFETCH_SCREENS,
+                                  start)[::-1]
+
+        self.image_loader.cancel()
+        for game_slug, is_installed in rows:
+            if self.loaded_images.get(game_slug) != is_installed:
+                self.image_loader.request(game_slug, game_slug,
+                                          self.icon_type, is_installed)
+
+        kept = set(slug for slug, _is_installed in self.get_rows(
+            model, start - screen * KEPT_SCREENS, end + screen * KEPT_SCREENS
+        ))
+        released = [slug for slug in self.loaded_images if slug not in kept]
+        if released:
+            placeholder = get_placeholder_pixbuf(self.icon_type)
+            for game_slug in released:
+                del self.loaded_images[game_slug]
+                row = self.get_row_by_slug(game_slug)
+                if row:
+                    row[COL_ICON] = placeholder
+        return False
+
+    def on_images_loaded(self, results):
+        """Swap the placeholders for the images loaded."""
+        for game_slug, (_slug, _icon_type, is_installed), pixbuf in results:
+            row = self.get_row_by_slug(game_slug)
+            # Images loaded for a previous state of the game are outdated
+            if row and row[COL_INSTALLED] == is_installed:
+                row[COL_ICON] = pixbuf
+                self.loaded_images[game_slug] = is_installed
+        if type(self) is GameGridView:
+            self.queue_draw()
 
     def remove_game(self, removed_id):
-        row = self.get_row_by_slug(removed_id)
-        if row:
-            self.remove_row(row.iter)
-
-    def remove_row(self, model_iter):
         """Remove a game from the view."""
-        store = self.game_store.store
-        store.remove(model_iter)
+        self.game_store.remove_game(removed_id)
+        self.loaded_images.pop(removed_id, None)
 
     def set_installed(self, game):
         """Update a game row to show as installed"""
@@ -203,12 +443,9 @@ class GameView(object):
         """Update game icon."""
         row = self.get_row_by_slug(game_slug)
         if row:
-            game_pixpuf = get_pixbuf_for_game(game_slug, self.icon_type,
-                                              is_installed=is_installed)
-            row[COL_ICON] = game_pixpuf
             row[COL_INSTALLED] = is_installed
-            if type(self) is GameGridView:
-                GLib.idle_add(self.queue_draw)
+            self.loaded_images.pop(game_slug, None)
+            self.schedule_images_update()
 
     def popup_contextual_menu(self, view, event):
         """Contextual menu."""
@@ -237,6 +474,10 @@ class GameListView(Gtk.TreeView, GameView):
     def __init__(self, games, filter_text='', filter_runner='',
                  icon_type=None):
         self.icon_type = icon_type
+        self.image_loader = ImageLoader(get_pixbuf_for_game,
+                                        self.on_images_loaded)
+        # Installed state of the games whose image is loaded, by slug
+        self.loaded_images = {}
         self.game_store = GameStore(icon_type=icon_type,
                                     filter_text=filter_text,
                                     filter_runner=filter_runner)
@@ -256,6 +497,7 @@ class GameListView(Gtk.TreeView, GameView):
         name_cell = self.set_text_cell()
         name_cell.set_padding(5, 0)
         column = self.set_column(name_cell, "Name", COL_NAME)
+        column.set_sort_column_id(COL_SORT_KEY)
         width = settings.read_setting('name_column_width', 'list view')
         column.set_fixed_width(int(width) if width else 200)
         self.append_column(column)
@@ -330,6 +572,10 @@ class GameGridView(Gtk.IconView, GameView):
     def __init__(self, games, filter_text='', filter_runner='',
                  icon_type=None):
         self.icon_type = icon_type
+        self.image_loader = ImageLoader(get_pixbuf_for_game,
+                                        self.on_images_loaded)
+        # Installed state of the games whose image is loaded, by slug
+        self.loaded_images = {}
         self.game_store = GameStore(icon_type=icon_type,
                                     filter_text=filter_text,
                                     filter_runner=filter_runner)
@@ -400,6 +646,15 @@ class ContextualMenu(Gtk.Menu):
             menuitem.action_id = name
             self.append(menuitem)
 
+    @staticmethod
+    def get_runner_action(runner_slug, game_slug, method_name):
+        def run_action(*args):
+            game_config = LutrisConfig(runner_slug=runner_slug,
+                                       game_slug=game_slug)
+            runner = import_runner(runner_slug)(game_config)
+            return getattr(runner, method_name)(*args)
+        return run_action
+
     def popup(self, event, game_row):
         game_slug = game_row[COL_ID]
         runner_slug = game_row[COL_RUNNER]
@@ -410,13 +665,16 @@ class ContextualMenu(Gtk.Menu):
 
         # Main items
         self.add_menuitems(self.main_entries)
-        # Runner specific items
+        # Runner specific items, the runner is only instantiated when one
+        # of them is activated
         runner_entries = None
         if runner_slug:
-            game_config = LutrisConfig(runner_slug=runner_slug,
-                                       game_slug=game_slug)
-            runner = import_runner(runner_slug)(game_config)
-            runner_entries = runner.context_menu_entries
+            runner_entries = [
+                (name, label,
+                 self.get_runner_action(runner_slug, game_slug, method_name))
+                for name, label, method_name
+                in import_runner(runner_slug).context_menu_entries
+            ]
         if runner_entries:
             self.append(Gtk.SeparatorMenuItem())
             self.add_menuitems(runner_entries)
@@ -424,18 +682,17 @@ class ContextualMenu(Gtk.Menu):
 
         # Hide some items
         is_installed = game_row[COL_INSTALLED]
+        has_desktop_launcher = desktop_launcher_exists(game_slug)
+        has_menu_launcher = menu_launcher_exists(game_slug)
         hiding_condition = {
             'add': is_installed,
             'play': not is_installed,
             'configure': not is_installed,
-            'desktop-shortcut': (not is_installed
-                                 or desktop_launcher_exists(game_slug)),
-            'menu-shortcut': (not is_installed
-                              or menu_launcher_exists(game_slug)),
+            'desktop-shortcut': not is_installed or has_desktop_launcher,
+            'menu-shortcut': not is_installed or has_menu_launcher,
             'rm-desktop-shortcut': (not is_installed
-                                    or not desktop_launcher_exists(game_slug)),
-            'rm-menu-shortcut': (not is_installed
-                                 or not menu_launcher_exists(game_slug)),
+                                    or not has_desktop_launcher),
+            'rm-menu-shortcut': not is_installed or not has_menu_launcher,
             'browse': not is_installed or game_row[COL_RUNNER] == 'browser',
         }
         for menuitem in self.get_children():
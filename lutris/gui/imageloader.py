@@ -0,0 +1,91 @@
+"""Load the images of the game views without blocking the main loop."""
+import threading
+from collections import OrderedDict
+
+from gi.repository import GLib
+
+from lutris.util.log import logger
+
+# Number of threads decoding images
+WORKER_COUNT = 2
+# Milliseconds during which loaded images are gathered before being handed
+# over to the main loop
+BATCH_DELAY = 50
+
+
+class ImageLoader(object):
+    """Run `load` in worker threads for each requested key.
+
+    Results are passed in batches, as a list of (key, args, result), to
+    `on_loaded` which is called from the main loop. Keys are loaded in the
+    order they are requested.
+    """
+    def __init__(self, load, on_loaded, workers=WORKER_COUNT,
+                 batch_delay=BATCH_DELAY):
+        self.load = load
+        self.on_loaded = on_loaded
+        self.worker_count = workers
+        self.batch_delay = batch_delay
+        self.condition = threading.Condition()
+        self.pending = OrderedDict()
+        self.results = []
+        self.delivery_scheduled = False
+        self.stopped = False
+        self.workers = []
+
+    def _start_workers(self):
+        while len(self.workers) < self.worker_count:
+            worker = threading.Thread(target=self._work)
+            worker.daemon = True
+            worker.start()
+            self.workers.append(worker)
+
+    def request(self, key, *args):
+        """Load key with args, replacing the pending request for key."""
+        with self.condition:
+            self.pending[key] = args
+            self._start_workers()
+            self.condition.notify()
+
+    def cancel(self):
+        """Forget the pending requests."""
+        with self.condition:
+            self.pending.clear()
+
+    def stop(self):
+        """Stop the workers, pending requests are never loaded."""
+        with self.condition:
+            self.stopped = True
+            self.pending.clear()
+            self.condition.notify_all()
+
+    def _work(self):
+        while True:
+            with self.condition:
+                while not (self.stopped or self.pending):
+                    self.condition.wait()
+                if self.stopped:
+                    return
+                key, args = self.pending.popitem(last=False)
+            try:
+                result = self.load(*args)
+            except Exception as ex:
+                logger.error("Failed to load %s: %s", key, ex)
+                continue
+            with self.condition:
+                if self.stopped:
+                    return
+                self.results.append((key, args, result))
+                if not self.delivery_scheduled:
+                    self.delivery_scheduled = True
+                    GLib.timeout_add(self.batch_delay, self.deliver)
+
+    def deliver(self):
+        """Hand the loaded results over, from the main loop."""
+        with self.condition:
+            results = self.results
+            self.results = []
+            self.delivery_scheduled = False
+        if results:
+            self.on_loaded(results)
+        return False
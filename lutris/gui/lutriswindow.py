@@ -12,10 +12,13 @@ from lutris.sync import Sync
 from lutris.util import resources
 from lutris.util.log import logger
 from lutris.util.jobs import AsyncCall
+from lutris.util.persistence import WRITER
+from lutris.util.startup import PROFILER
 from lutris.util.strings import slugify
 from lutris.util import datapath
 
 from lutris.gui import dialogs
+from lutris.gui.pixbufcache import PIXBUF_CACHE
 from lutris.gui.sidebar import SidebarTreeView
 from lutris.gui.logwindow import LogWindow
 from lutris.gui.runnersdialog import RunnersDialog
@@ -28,6 +31,9 @@ from lutris.gui.gameviews import (
     GameListView, GameGridView, ContextualMenu
 )
 
+# Milliseconds without typing before the game views are filtered
+SEARCH_DELAY = 150
+
 
 def load_view(view, games=[], filter_text=None, icon_type=None):
     if view == 'grid':
@@ -51,6 +57,7 @@ class LutrisWindow(object):
 
         self.running_game = None
         self.threads_stop_requests = []
+        self.search_timer = None
 
         # Emulate double click to workaround GTK bug #484640
         # https://bugzilla.gnome.org/show_bug.cgi?id=484640
@@ -76,10 +83,13 @@ class LutrisWindow(object):
         )
         show_installed_games_menuitem.set_active(self.filter_installed)
         logger.debug("Getting game list")
-        game_list = get_game_list(self.filter_installed)
-        logger.debug("Switching view")
-        self.view = load_view(view_type, game_list,
-                              icon_type=self.icon_type)
+        with PROFILER.phase('view_create'):
+            game_list = get_game_list(self.filter_installed)
+            logger.debug("Switching view")
+            self.view = load_view(view_type, game_list,
+                                  icon_type=self.icon_type)
+        # The view fills its store from the main loop
+        self.view.connect('view-filled', self.on_view_filled)
         logger.debug("Connecting signals")
         self.main_box = self.builder.get_object('main_box')
         self.splash_box = self.builder.get_object('splash_box')
@@ -160,14 +170,16 @@ class LutrisWindow(object):
         self.switch_splash_screen()
 
         # Connect account and/or sync
-        credentials = api.read_api_key()
-        if credentials:
-            self.on_connect_success(None, credentials)
-        else:
-            self.toggle_connection(False)
-            self.sync_library()
+        with PROFILER.phase('sync'):
+            credentials = api.read_api_key()
+            if credentials:
+                self.on_connect_success(None, credentials)
+            else:
+                self.toggle_connection(False)
+                self.sync_library()
         # Update Runtime
-        AsyncCall(runtime.update_runtime, None, self.set_status)
+        with PROFILER.phase('runtime'):
+            AsyncCall(runtime.update_runtime, None, self.set_status)
 
     @property
     def current_view_type(self):
@@ -243,11 +255,14 @@ class LutrisWindow(object):
         def update_gui(result, error):
             added, updated, installed, uninstalled = result
             self.switch_splash_screen()
-            self.view.fill_store(added)
+            changed_games = pga.get_games(slugs=added | updated)
+            self.view.fill_store([game for game in changed_games
+                                  if game['slug'] in added])
 
             def update_existing_games():
-                for game in updated.difference(added):
-                    self.view.update_row(pga.get_game_by_slug(game))
+                for game in changed_games:
+                    if game['slug'] not in added:
+                        self.view.update_row(game)
 
                 for game in installed.difference(added):
                     if not self.view.get_row_by_slug(game):
@@ -270,7 +285,7 @@ class LutrisWindow(object):
         AsyncCall(sync.sync_all, update_gui)
 
     def sync_icons(self, stop_request=None):
-        game_list = pga.get_games()
+        game_list = pga.iter_games(columns=['slug'])
         resources.fetch_icons([game_info['slug'] for game_info in game_list],
                               callback=self.on_image_downloaded,
                               stop_request=stop_request)
@@ -371,6 +386,10 @@ class LutrisWindow(object):
         settings.write_setting('width', width)
         settings.write_setting('height', height)
 
+        logger.debug("PGA cache stats: %s", pga.GAME_CACHE.get_stats())
+        WRITER.flush()
+        logger.debug("Config write stats: %s", WRITER.get_stats())
+        logger.debug("Pixbuf cache stats: %s", PIXBUF_CACHE.get_stats())
         Gtk.main_quit(*args)
         logger.debug("Quitting lutris")
 
@@ -394,8 +413,16 @@ class LutrisWindow(object):
         dialogs.PgaSourceDialog()
 
     def on_search_entry_changed(self, widget):
-        self.view.game_store.filter_text = widget.get_text()
+        """Filter the view once the user stops typing."""
+        if self.search_timer:
+            GLib.source_remove(self.search_timer)
+        self.search_timer = GLib.timeout_add(SEARCH_DELAY, self.update_search)
+
+    def update_search(self):
+        self.search_timer = None
+        self.view.game_store.filter_text = self.search_entry.get_text()
         self.view.emit('filter-updated')
+        return False
 
     def _get_current_game_slug(self):
         """Return the slug of the current selected game while taking care of the
@@ -447,6 +474,9 @@ class LutrisWindow(object):
         self.play_button.set_sensitive(sensitive)
         self.delete_button.set_sensitive(sensitive)
 
+    def on_view_filled(self, view, fill_time):
+        PROFILER.add_phase('view_fill', fill_time)
+
     def on_game_installed(self, view, slug):
         if not self.view.get_row_by_slug(slug):
             self.add_game_to_view(slug)
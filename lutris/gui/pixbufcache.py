@@ -0,0 +1,99 @@
+"""Process-wide cache of the banners and icons displayed in the game views."""
+import threading
+from collections import OrderedDict
+
+from lutris import settings
+from lutris.util import resources
+
+# Default memory budget of the cache, in MiB
+DEFAULT_CACHE_SIZE = 64
+
+
+def get_pixbuf_size(pixbuf):
+    """Return the memory used by the pixels of a pixbuf, in bytes."""
+    return pixbuf.get_rowstride() * pixbuf.get_height()
+
+
+class PixbufCache(object):
+    """Least recently used cache of pixbufs, limited by their total size.
+
+    Keys are tuples starting with the slug of the game the pixbuf is for,
+    so all the pixbufs of a game can be dropped when its files change.
+    """
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is None:
+                self.misses += 1
+                return None
+            # Move the entry to the end, where the most recent ones are
+            self.entries[key] = entry
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, pixbuf, size=None):
+        if size is None:
+            size = get_pixbuf_size(pixbuf)
+        if size > self.max_size:
+            return
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous:
+                self.size -= previous[1]
+            self.entries[key] = (pixbuf, size)
+            self.size += size
+            while self.size > self.max_size:
+                _key, (_pixbuf, evicted_size) = self.entries.popitem(
+                    last=False
+                )
+                self.size -= evicted_size
+                self.evictions += 1
+
+    def invalidate(self, game_slug=None):
+        """Drop the pixbufs of a game, or all of them."""
+        with self.lock:
+            if game_slug is None:
+                self.entries.clear()
+                self.size = 0
+                return
+            for key in [key for key in self.entries if key[0] == game_slug]:
+                self.size -= self.entries.pop(key)[1]
+
+    def get_stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': float(self.hits) / lookups if lookups else 0,
+                'evictions': self.evictions,
+                'entries': len(self.entries),
+                'size': self.size,
+                'max_size': self.max_size,
+            }
+
+
+def get_cache_size():
+    """Return the memory budget set by the pixbuf_cache_size setting (MiB),
+    in bytes."""
+    try:
+        cache_size = int(settings.read_setting('pixbuf_cache_size') or
+                         DEFAULT_CACHE_SIZE)
+    except ValueError:
+        cache_size = DEFAULT_CACHE_SIZE
+    return cache_size * 1024 * 1024
+
+
+PIXBUF_CACHE = PixbufCache(get_cache_size())
+resources.icon_change_callbacks.append(
+    lambda game, icon_type: PIXBUF_CACHE.invalidate(game)
+)
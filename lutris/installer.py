@@ -19,7 +19,7 @@ from lutris.util.jobs import AsyncCall
 from lutris.util.log import logger
 
 from lutris.game import Game
-from lutris.config import LutrisConfig
+from lutris.config import LutrisConfig, config_file_exists, write_config_file
 from lutris.gui.config_dialogs import AddGameDialog
 from lutris.gui.dialogs import ErrorDialog, NoInstallerDialog
 from lutris.runners import (
@@ -338,7 +338,7 @@ class ScriptInterpreter(object):
         # Get existing config
         config_filename = os.path.join(settings.CONFIG_DIR,
                                        "games/%s.yml" % self.game_slug)
-        if self.requires and os.path.exists(config_filename):
+        if self.requires and config_file_exists(config_filename):
             # The installer is patching an existing game, update its config
             # XXX Maybe drop the self.requires condition and always update
             #     the existing config?
@@ -397,10 +397,8 @@ class ScriptInterpreter(object):
                     launcher_description = launcher_description
                 config['game'][launcher] = launcher_description
 
-        yaml_config = yaml.safe_dump(config, default_flow_style=False)
-        logger.debug(yaml_config)
-        with open(config_filename, "w") as config_file:
-            config_file.write(yaml_config)
+        logger.debug(config)
+        write_config_file(config_filename, config, safe=True)
 
     def _map_command(self, command_data):
         """ Converts a line from the installer directive an internal method """
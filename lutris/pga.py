@@ -2,7 +2,10 @@
 """Personnal Game Archive module. Handle local database of user's games."""
 
 import os
+import re
 import logging
+import sqlite3
+import threading
 
 from lutris.util.strings import slugify
 from lutris.util.log import logger
@@ -12,6 +15,37 @@ from lutris import settings
 PGA_DB = settings.PGA_DB
 LOGGER = logging.getLogger(__name__)
 
+# Must be incremented each time a table schema or an index changes, the
+# migrations are skipped at startup when the database is already up to date.
+SCHEMA_VERSION = 2
+
+GAMES_INDEXES = [
+    {'name': 'games_slug', 'columns': ['slug'], 'unique': True},
+    {'name': 'games_installer_slug', 'columns': ['installer_slug']},
+    {'name': 'games_runner', 'columns': ['runner']},
+    {'name': 'games_installed', 'columns': ['installed']},
+]
+
+# Full-text index of the games, kept in sync with the games table by triggers
+SEARCH_INDEX_QUERIES = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS games_fts USING fts5("
+    "name, slug, runner, content='games', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='1 2 3')",
+    "CREATE TRIGGER IF NOT EXISTS games_fts_insert AFTER INSERT ON games "
+    "BEGIN INSERT INTO games_fts(rowid, name, slug, runner) "
+    "VALUES (new.id, new.name, new.slug, new.runner); END",
+    "CREATE TRIGGER IF NOT EXISTS games_fts_delete AFTER DELETE ON games "
+    "BEGIN INSERT INTO games_fts(games_fts, rowid, name, slug, runner) "
+    "VALUES ('delete', old.id, old.name, old.slug, old.runner); END",
+    "CREATE TRIGGER IF NOT EXISTS games_fts_update "
+    "AFTER UPDATE OF name, slug, runner ON games "
+    "BEGIN INSERT INTO games_fts(games_fts, rowid, name, slug, runner) "
+    "VALUES ('delete', old.id, old.name, old.slug, old.runner); "
+    "INSERT INTO games_fts(rowid, name, slug, runner) "
+    "VALUES (new.id, new.name, new.slug, new.runner); END",
+    "INSERT INTO games_fts(games_fts) VALUES ('rebuild')",
+]
+
 
 def get_schema(tablename):
     """
@@ -64,6 +98,25 @@ def create_table(name, schema):
         cursor.execute(query)
 
 
+def create_index(tablename, name, columns, unique=False):
+    query = "CREATE %sINDEX IF NOT EXISTS %s ON %s (%s)" % (
+        "UNIQUE " if unique else "", name, tablename, ", ".join(columns)
+    )
+    LOGGER.debug("[PGAQuery] %s", query)
+    with sql.db_cursor(PGA_DB) as cursor:
+        cursor.execute(query)
+
+
+def get_schema_version():
+    with sql.db_cursor(PGA_DB) as cursor:
+        return cursor.execute("pragma user_version").fetchone()[0]
+
+
+def set_schema_version(version):
+    with sql.db_cursor(PGA_DB) as cursor:
+        cursor.execute("pragma user_version = %d" % version)
+
+
 def migrate(table, schema):
     existing_schema = get_schema(table)
     migrated_fields = []
@@ -105,25 +158,75 @@ def migrate_sources():
     return migrate('sources', schema)
 
 
+def migrate_search_index():
+    """Create the full-text search index, if SQLite supports FTS5."""
+    try:
+        with sql.db_cursor(PGA_DB) as cursor:
+            for query in SEARCH_INDEX_QUERIES:
+                cursor.execute(query)
+    except sqlite3.OperationalError as ex:
+        logger.warning("Full-text search of games unavailable: %s", ex)
+
+
+def deduplicate_games():
+    """Only keep one row per slug, preferring installed then recent ones."""
+    query = (
+        "DELETE FROM games WHERE slug IS NOT NULL AND id NOT IN ("
+        "SELECT (SELECT id FROM games AS g WHERE g.slug = s.slug "
+        "ORDER BY ifnull(g.installed, 0) DESC, g.id DESC LIMIT 1) "
+        "FROM (SELECT DISTINCT slug FROM games) AS s)"
+    )
+    with sql.db_cursor(PGA_DB) as cursor:
+        cursor.execute(query)
+        removed = cursor.rowcount
+    if removed:
+        logger.info("Removed %d duplicate games from the PGA", removed)
+    return removed
+
+
 def syncdb():
     """Update the database to the current version, making necessary changes
     for backwards compatibility,"""
-    migrated = migrate_games()
-    if 'installed' in migrated:
-        set_installed_games()
-    migrate_sources()
-
-    # Rename runners
-    sql.db_update(PGA_DB, 'games', {'runner': 'mame'}, ('runner', 'sdlmame'))
-    sql.db_update(PGA_DB, 'games', {'runner': 'mess'}, ('runner', 'sdlmess'))
+    GAME_CACHE.invalidate()
+    version = get_schema_version()
+    if version == SCHEMA_VERSION:
+        return
+    LOGGER.debug("Migrating PGA from version %d to %d",
+                 version, SCHEMA_VERSION)
+    with sql.db_transaction(PGA_DB):
+        migrated = migrate_games()
+        if 'installed' in migrated:
+            set_installed_games()
+        migrate_sources()
+
+        # Rename runners
+        sql.db_update(PGA_DB, 'games', {'runner': 'mame'},
+                      ('runner', 'sdlmame'))
+        sql.db_update(PGA_DB, 'games', {'runner': 'mess'},
+                      ('runner', 'sdlmess'))
+
+        if version < 1:
+            deduplicate_games()
+        for index in GAMES_INDEXES:
+            create_index('games', **index)
+        migrate_search_index()
+        set_schema_version(SCHEMA_VERSION)
+    GAME_CACHE.invalidate()
 
 
 def set_installed_games():
+    """Mark the games whose directory exists as installed.
+
+    Runs during migrations, before the unique index on slugs exists.
+    """
     games = get_games()
-    for game in games:
-        if game['directory'] and os.path.exists(game['directory']):
-            sql.db_update(PGA_DB, 'games',
-                          {'installed': 1}, ('slug', game['slug']))
+    with sql.db_cursor(PGA_DB) as cursor:
+        cursor.executemany(
+            "UPDATE games SET installed = 1 WHERE slug = ?",
+            [(game['slug'], ) for game in games
+             if game['directory'] and os.path.exists(game['directory'])]
+        )
+    GAME_CACHE.invalidate()
 
 
 def get_table_length(table='games'):
@@ -133,39 +236,238 @@ def get_table_length(table='games'):
         return cursor.fetchone()[0]
 
 
-def get_games(name_filter=None, filter_installed=False):
-    """Get the list of every game in database."""
+def get_games(name_filter=None, filter_installed=False, slugs=None):
+    """Get the list of every game in database.
+
+    :param slugs: Only get the games with these slugs
+    """
+    if slugs is None:
+        return _select_games(name_filter, filter_installed)
+    slugs = list(slugs)
+    games = []
+    # Stay below SQLite's limit on the number of query parameters
+    for start in range(0, len(slugs), 500):
+        games += _select_games(name_filter, filter_installed,
+                               slugs[start:start + 500])
+    return sorted(games, key=lambda game: game['slug'])
+
+
+def _select_games(name_filter=None, filter_installed=False, slugs=None):
     with sql.db_cursor(PGA_DB) as cursor:
         query = "select * from games"
-        params = ()
+        params = []
         filters = []
         if name_filter:
-            params = (name_filter, )
+            params.append(name_filter)
             filters.append("name LIKE ?")
         if filter_installed:
             filters.append("installed = 1")
+        if slugs is not None:
+            params += slugs
+            filters.append("slug IN (%s)" % ", ".join("?" * len(slugs)))
         if filters:
             query += " WHERE " + " AND ".join([f for f in filters])
         query += " ORDER BY slug"
-        rows = cursor.execute(query, params)
-        results = rows.fetchall()
+        cursor.execute(query, params)
         column_names = [column[0] for column in cursor.description]
-    game_list = []
-    for row in results:
-        game_info = {}
-        for index, column in enumerate(column_names):
-            game_info[column] = row[index]
-        game_list.append(game_info)
-    return game_list
+        return [dict(zip(column_names, row)) for row in cursor]
+
+
+def iter_games(columns=None, where=None, order_by='slug'):
+    """Iterate over the games in database without loading them all at once.
+
+    Games are yielded as sqlite3.Row objects, which support item access by
+    column name.
+
+    :param list columns: Only fetch these columns
+    :param dict where: Column names and the values they must be equal to
+    """
+    return sql.db_iter_select(PGA_DB, "games", fields=columns,
+                              conditions=where, order_by=order_by)
+
+
+def has_search_index():
+    with sql.db_cursor(PGA_DB) as cursor:
+        cursor.execute("select 1 from sqlite_master where name = 'games_fts'")
+        return bool(cursor.fetchone())
+
+
+def search_games(query, limit=None, ranked=True):
+    """Return the slugs of the games matching `query`.
+
+    Each word of the query must match the beginning of a word in the name,
+    slug or runner of the game. Ranked results are sorted best matches first,
+    which is slower when there are many matches.
+    """
+    if isinstance(query, str):
+        query = query.decode('UTF-8')
+    terms = re.findall(r'\w+', query, re.UNICODE)
+    if not terms:
+        return []
+    with sql.db_cursor(PGA_DB) as cursor:
+        if not has_search_index():
+            cursor.execute(
+                "SELECT slug FROM games WHERE %s ORDER BY name LIMIT ?" % (
+                    " AND ".join(["name LIKE ?"] * len(terms))
+                ),
+                ["%%%s%%" % term for term in terms] + [limit or -1]
+            )
+        elif ranked:
+            cursor.execute(
+                "SELECT games.slug FROM games_fts "
+                "JOIN games ON games.id = games_fts.rowid "
+                "WHERE games_fts MATCH ? "
+                "ORDER BY bm25(games_fts, 10.0, 5.0, 1.0) LIMIT ?",
+                (" ".join(['"%s"*' % term for term in terms]), limit or -1)
+            )
+        else:
+            cursor.execute(
+                "SELECT slug FROM games WHERE id IN "
+                "(SELECT rowid FROM games_fts WHERE games_fts MATCH ? "
+                "LIMIT ?)",
+                (" ".join(['"%s"*' % term for term in terms]), limit or -1)
+            )
+        return [row[0] for row in cursor]
+
+
+def get_db_signature(db_path):
+    """Return a value changing each time a database file is written to,
+    including its write-ahead log."""
+    signature = []
+    for path in (db_path, db_path + '-wal'):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            signature.append(None)
+        else:
+            signature.append((stat.st_ino, stat.st_mtime, stat.st_size))
+    return tuple(signature)
+
+
+class GameCache(object):
+    """Process-wide cache of the games table, keyed by slug and installer slug.
+
+    The whole table is loaded with a single query on first access. Writes
+    made through this module mark the affected slugs as dirty, they are read
+    back from the database on the next lookup.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.db_path = None
+        self.by_slug = None
+        self.by_installer_slug = {}
+        self.dirty = set()
+        self.signature = None
+        self.hits = 0
+        self.misses = 0
+
+    def load(self):
+        """Load the whole table now."""
+        with self.lock:
+            self._load()
+
+    def revalidate(self):
+        """Drop the cache if the database was changed since it was loaded,
+        by this or another process."""
+        with self.lock:
+            if (self.by_slug is not None and
+                    self.signature != get_db_signature(self.db_path)):
+                self.by_slug = None
+                self.dirty.clear()
+
+    def get(self, value, field='slug'):
+        with self.lock:
+            if self.db_path != PGA_DB or self.by_slug is None:
+                self._load()
+            elif self.dirty:
+                self._refresh()
+            else:
+                self.hits += 1
+            if field == 'installer_slug':
+                games = self.by_installer_slug.get(value)
+                game = games[0] if games else None
+            else:
+                game = self.by_slug.get(value)
+        return dict(game) if game else {}
+
+    def invalidate(self, slugs=None):
+        """Mark `slugs` as changed in the database, or all games if None."""
+        with self.lock:
+            if slugs is None:
+                self.by_slug = None
+                self.dirty.clear()
+            elif self.by_slug is not None:
+                self.dirty.update(slugs)
+
+    def get_stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': float(self.hits) / lookups if lookups else 0.0,
+        }
+
+    def _load(self):
+        self.misses += 1
+        self.db_path = PGA_DB
+        self.signature = get_db_signature(PGA_DB)
+        self.dirty.clear()
+        self.by_slug = {}
+        self.by_installer_slug = {}
+        for game in sql.db_select(PGA_DB, "games"):
+            self.by_slug[game['slug']] = game
+            self._index_installer_slug(game)
+
+    def _refresh(self):
+        self.misses += 1
+        dirty = list(self.dirty)
+        self.dirty.clear()
+        for slug in dirty:
+            game = self.by_slug.pop(slug, None)
+            if game:
+                self._unindex_installer_slug(game)
+        # Stay below SQLite's limit on the number of query parameters
+        for start in range(0, len(dirty), 500):
+            chunk = dirty[start:start + 500]
+            with sql.db_cursor(PGA_DB) as cursor:
+                cursor.execute(
+                    "select * from games where slug in (%s)" % (
+                        ", ".join("?" * len(chunk))
+                    ), chunk
+                )
+                column_names = [column[0] for column in cursor.description]
+                for row in cursor.fetchall():
+                    game = dict(zip(column_names, row))
+                    self.by_slug[game['slug']] = game
+                    self._index_installer_slug(game)
+
+    def _index_installer_slug(self, game):
+        """Map the installer slug of a game to the first game (by id) using
+        it, the other games using it are kept in case that one changes."""
+        if not game['installer_slug']:
+            return
+        games = self.by_installer_slug.setdefault(game['installer_slug'],
+                                                  [])
+        games.append(game)
+        if len(games) > 1:
+            games.sort(key=lambda g: g['id'])
+
+    def _unindex_installer_slug(self, game):
+        games = self.by_installer_slug.get(game['installer_slug'])
+        if not games:
+            return
+        games.remove(game)
+        if not games:
+            del self.by_installer_slug[game['installer_slug']]
+
+
+GAME_CACHE = GameCache()
 
 
 def get_game_by_slug(slug, field='slug'):
     if field not in ('slug', 'installer_slug'):
         raise ValueError("Invalid field name: %s", field)
-    game_result = sql.db_select(PGA_DB, "games", condition=(field, slug))
-    if game_result:
-        return game_result[0]
-    return {}
+    return GAME_CACHE.get(slug, field)
 
 
 def add_game(name, **game_data):
@@ -174,6 +476,7 @@ def add_game(name, **game_data):
     if 'slug' not in game_data:
         game_data['slug'] = slugify(name)
     sql.db_insert(PGA_DB, "games", game_data)
+    GAME_CACHE.invalidate([game_data['slug']])
 
 
 def add_games_bulk(games):
@@ -183,31 +486,68 @@ def add_games_bulk(games):
 
     :type games: list of dicts
     """
+    slugs = [game['slug'] for game in games]
     sql.db_insert_bulk(PGA_DB, "games", games)
+    GAME_CACHE.invalidate(slugs)
+
+
+def upsert_games_bulk(games):
+    """Add or update a list of games in a single transaction.
+
+    The dicts must have an identical set of keys, including `slug`. Only the
+    given fields of existing games are updated.
+
+    :type games: list of dicts
+    :return: The slugs of the games that were actually added or modified
+    :rtype: set
+    """
+    if not games:
+        return set()
+    columns = games[0].keys()
+    if 'slug' not in columns:
+        raise ValueError("Missing slug in games to upsert")
+    with sql.db_transaction(PGA_DB) as cursor:
+        cursor.execute("select %s from games" % ", ".join(columns))
+        slug_index = columns.index('slug')
+        existing = dict((row[slug_index], row) for row in cursor)
+        changed_games = []
+        for game in games:
+            values = tuple([game[column] for column in columns])
+            if existing.get(values[slug_index]) != values:
+                changed_games.append(game)
+        if changed_games:
+            sql.db_upsert_bulk(PGA_DB, "games", changed_games, 'slug')
+    changed = set([game['slug'] for game in changed_games])
+    GAME_CACHE.invalidate(changed)
+    return changed
 
 
 def add_or_update(name, runner, slug=None, **kwargs):
     if not slug:
         slug = slugify(name)
-    game = get_game_by_slug(slug)
     kwargs['name'] = name
     kwargs['runner'] = runner
     kwargs['slug'] = slug
-    if game:
-        game_id = game['id']
-        sql.db_update(PGA_DB, "games", kwargs, ('id', game_id))
-    else:
-        add_game(**kwargs)
+    with sql.db_transaction(PGA_DB):
+        game = get_game_by_slug(slug)
+        if game:
+            game_id = game['id']
+            sql.db_update(PGA_DB, "games", kwargs, ('id', game_id))
+        else:
+            add_game(**kwargs)
+    GAME_CACHE.invalidate([slug])
 
 
 def delete_game(slug):
     """Deletes a game from the PGA"""
     sql.db_delete(PGA_DB, "games", 'slug', slug)
+    GAME_CACHE.invalidate([slug])
 
 
 def set_uninstalled(slug):
     sql.db_update(PGA_DB, 'games', {'installed': 0, 'runner': ''},
                   ('slug', slug))
+    GAME_CACHE.invalidate([slug])
 
 
 def add_source(uri):
@@ -227,12 +567,13 @@ def read_sources():
 
 def write_sources(sources):
     db_sources = read_sources()
-    for uri in db_sources:
-        if uri not in sources:
-            sql.db_delete(PGA_DB, "sources", 'uri', uri)
-    for uri in sources:
-        if uri not in db_sources:
-            sql.db_insert(PGA_DB, "sources", {'uri': uri})
+    with sql.db_transaction(PGA_DB):
+        for uri in db_sources:
+            if uri not in sources:
+                sql.db_delete(PGA_DB, "sources", 'uri', uri)
+        for uri in sources:
+            if uri not in db_sources:
+                sql.db_insert(PGA_DB, "sources", {'uri': uri})
 
 
 def check_for_file(game, file_id):
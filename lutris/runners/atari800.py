@@ -2,13 +2,23 @@
 import os.path
 import logging
 
-from lutris import settings
+from lutris import settings, sysoptions
 from lutris.config import LutrisConfig
 from lutris.gui.dialogs import DownloadDialog, ErrorDialog
 from lutris.runners.runner import Runner
 from lutris.util.extract import extract_archive
 from lutris.util.system import get_md5_hash
-from lutris.util.display import get_resolutions
+
+
+@sysoptions.cached_provider
+def get_resolution_choices():
+    try:
+        screen_resolutions = [(resolution, resolution)
+                              for resolution in sysoptions.get_resolutions()]
+    except OSError:
+        screen_resolutions = []
+    screen_resolutions.insert(0, ('Desktop resolution', 'desktop'))
+    return screen_resolutions
 
 
 # pylint: disable=C0103
@@ -40,13 +50,6 @@ class atari800(Runner):
                      "and PRO.")
         }
     ]
-    try:
-        screen_resolutions = [(resolution, resolution)
-                              for resolution in get_resolutions()]
-    except OSError:
-        screen_resolutions = []
-    screen_resolutions.insert(0, ('Desktop resolution', 'desktop'))
-
     runner_options = [
         {
             "option": "bios_path",
@@ -76,7 +79,7 @@ class atari800(Runner):
         {
             "option": "resolution",
             "type": "choice",
-            "choices": screen_resolutions,
+            "choices": get_resolution_choices,
             "default": 'desktop',
             "label": "Fullscreen resolution"
         }
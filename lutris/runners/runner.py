@@ -33,6 +33,8 @@ class Runner(object):
     game_options = []
     runner_options = []
     system_options_override = []
+    # Entries of the game contextual menu, as (action id, label, name of the
+    # method called with the menu item)
     context_menu_entries = []
 
     def __init__(self, config=None):
@@ -4,9 +4,9 @@ import subprocess
 
 from textwrap import dedent
 
-from lutris import settings
+from lutris import settings, sysoptions
 from lutris.util.log import logger
-from lutris.util import display, system
+from lutris.util import system
 from lutris.runners.runner import Runner
 
 WINE_DIR = os.path.join(settings.RUNNER_DIR, "wine")
@@ -294,26 +294,20 @@ class wine(Runner):
         'wineboot.exe',
     )
 
+    context_menu_entries = [
+        ('winecfg', "Wine configuration", 'run_winecfg'),
+        ('wine-regedit', "Wine registry", 'run_regedit'),
+        ('winetricks', 'Winetricks', 'run_winetricks'),
+    ]
+
     def __init__(self, config=None):
         super(wine, self).__init__(config)
-        self.context_menu_entries = [
-            ('winecfg', "Wine configuration", self.run_winecfg),
-            ('wine-regedit', "Wine registry", self.run_regedit),
-            ('winetricks', 'Winetricks', self.run_winetricks),
-        ]
-
-        wine_versions = (
-            [('System (%s)' % self.system_wine_version, 'system')] +
-            [('Custom (select executable below)', 'custom')] +
-            [(version, version) for version in get_wine_versions()]
-        )
-
         self.runner_options = [
             {
                 'option': 'version',
                 'label': "Wine version",
                 'type': 'choice',
-                'choices': wine_versions,
+                'choices': self.get_version_choices,
                 'default': DEFAULT_WINE,
                 'help': ("The version of Wine used to launch the game.\n"
                          "Using the last version is generally recommended, "
@@ -341,7 +335,7 @@ class wine(Runner):
                 'option': 'Desktop_res',
                 'label': 'Virtual desktop resolution',
                 'type': 'choice_with_entry',
-                'choices': display.get_resolutions(),
+                'choices': sysoptions.get_resolutions,
                 'default': '800x600',
                 'help': ("The size of the virtual desktop in pixels.")
             },
@@ -445,6 +439,14 @@ class wine(Runner):
         else:
             return super(wine, self).working_dir
 
+    def get_version_choices(self):
+        """Return the choices of Wine versions, for the config dialog."""
+        return (
+            [('System (%s)' % self.system_wine_version, 'system')] +
+            [('Custom (select executable below)', 'custom')] +
+            [(version, version) for version in get_wine_versions()]
+        )
+
     @property
     def system_wine_version(self):
         """Return the version of Wine installed on the system."""
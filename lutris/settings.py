@@ -21,12 +21,14 @@ CACHE_DIR = os.path.join(GLib.get_user_cache_dir(), 'lutris')
 GAME_CONFIG_DIR = os.path.join(CONFIG_DIR, 'games')
 
 TMP_PATH = os.path.join(CACHE_DIR, 'tmp')
+THUMBNAIL_PATH = os.path.join(CACHE_DIR, 'thumbnails')
 BANNER_PATH = os.path.join(DATA_DIR, 'banners')
 ICON_PATH = os.path.join(GLib.get_user_data_dir(),
                          'icons', 'hicolor', '32x32', 'apps')
 
 sio = SettingsIO(CONFIG_FILE)
 PGA_DB = sio.read_setting('pga_path') or os.path.join(DATA_DIR, 'pga.db')
+CONFIG_DB = os.path.join(CONFIG_DIR, 'config.db')
 SITE_URL = sio.read_setting("website") or "https://lutris.net/"
 
 INSTALLER_URL = SITE_URL + 'games/install/%s/'
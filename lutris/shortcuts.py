@@ -2,7 +2,7 @@
 import os
 import stat
 import shutil
-import subprocess
+import threading
 
 from textwrap import dedent
 from xdg import BaseDirectory
@@ -10,12 +10,67 @@ from gi.repository import GLib
 
 from lutris.settings import CACHE_DIR
 
+_launcher_dirs = {}
+
+
+def get_desktop_dir():
+    """Return the XDG desktop directory, resolved once."""
+    if 'desktop' not in _launcher_dirs:
+        _launcher_dirs['desktop'] = (
+            GLib.get_user_special_dir(GLib.UserDirectory.DIRECTORY_DESKTOP)
+            or os.path.expanduser('~/Desktop')
+        )
+    return _launcher_dirs['desktop']
+
+
+def get_menu_dir():
+    """Return the directory of the XDG menu entries, resolved once."""
+    if 'menu' not in _launcher_dirs:
+        _launcher_dirs['menu'] = os.path.join(BaseDirectory.xdg_data_home,
+                                              'applications')
+    return _launcher_dirs['menu']
+
+
+class LauncherIndex(object):
+    """Names of the .desktop files of directories.
+
+    A directory is listed again only when its modification time changed.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.directories = {}
+
+    def get_launchers(self, directory):
+        try:
+            mtime = os.stat(directory).st_mtime
+        except OSError:
+            return set()
+        with self.lock:
+            entry = self.directories.get(directory)
+            if entry and entry[0] == mtime:
+                return entry[1]
+            launchers = set(filename for filename in os.listdir(directory)
+                            if filename.endswith('.desktop'))
+            self.directories[directory] = (mtime, launchers)
+            return launchers
+
+    def exists(self, directory, filename):
+        return filename in self.get_launchers(directory)
+
+    def update(self, directory, filename, exists):
+        """Record the creation or removal of a launcher."""
+        launchers = self.get_launchers(directory)
+        if exists:
+            launchers.add(filename)
+        else:
+            launchers.discard(filename)
+
+
+LAUNCHER_INDEX = LauncherIndex()
+
 
 def create_launcher(game_slug, game_name, desktop=False, menu=False):
     """Create .desktop file."""
-    desktop_dir = (
-        GLib.get_user_special_dir(GLib.UserDirectory.DIRECTORY_DESKTOP)
-    )
     launcher_content = dedent(
         """
         [Desktop Entry]
@@ -34,51 +89,36 @@ def create_launcher(game_slug, game_name, desktop=False, menu=False):
     os.chmod(tmp_launcher_path, stat.S_IREAD | stat.S_IWRITE | stat.S_IEXEC |
              stat.S_IRGRP | stat.S_IWGRP | stat.S_IXGRP)
 
+    directories = []
     if desktop:
-        shutil.copy(tmp_launcher_path,
-                    os.path.join(desktop_dir, launcher_filename))
+        directories.append(get_desktop_dir())
     if menu:
-        menu_path = os.path.join(GLib.get_user_data_dir(), 'applications')
+        directories.append(get_menu_dir())
+    for directory in directories:
         shutil.copy(tmp_launcher_path,
-                    os.path.join(menu_path, launcher_filename))
+                    os.path.join(directory, launcher_filename))
+        LAUNCHER_INDEX.update(directory, launcher_filename, True)
     os.remove(tmp_launcher_path)
 
 
 def desktop_launcher_exists(game_slug):
-    filename = "%s.desktop" % game_slug
-
-    desktop_dir = subprocess.Popen(['xdg-user-dir', 'DESKTOP'],
-                                   stdout=subprocess.PIPE).communicate()[0]
-    desktop_dir = desktop_dir.strip()
-    file_path = os.path.join(desktop_dir, filename)
-    if os.path.exists(file_path):
-        return True
-    return False
+    return LAUNCHER_INDEX.exists(get_desktop_dir(), "%s.desktop" % game_slug)
 
 
 def menu_launcher_exists(game_slug):
-    filename = "%s.desktop" % game_slug
-    menu_path = os.path.join(BaseDirectory.xdg_data_home, 'applications')
-    file_path = os.path.join(menu_path, filename)
-    if os.path.exists(file_path):
-        return True
-    return False
+    return LAUNCHER_INDEX.exists(get_menu_dir(), "%s.desktop" % game_slug)
 
 
 def remove_launcher(game_slug, desktop=False, menu=False):
     """Remove existing .desktop file."""
     filename = "%s.desktop" % game_slug
-
+    directories = []
     if desktop:
-        desktop_dir = subprocess.Popen(['xdg-user-dir', 'DESKTOP'],
-                                       stdout=subprocess.PIPE).communicate()[0]
-        desktop_dir = desktop_dir.strip()
-        file_path = os.path.join(desktop_dir, filename)
-        if os.path.exists(file_path):
-            os.remove(file_path)
-
+        directories.append(get_desktop_dir())
     if menu:
-        menu_path = os.path.join(BaseDirectory.xdg_data_home, 'applications')
-        file_path = os.path.join(menu_path, filename)
+        directories.append(get_menu_dir())
+    for directory in directories:
+        file_path = os.path.join(directory, filename)
         if os.path.exists(file_path):
             os.remove(file_path)
+        LAUNCHER_INDEX.update(directory, filename, False)
@@ -59,7 +59,6 @@ class Sync(object):
         for game in remote_library:
             slug = game['slug']
             if slug in not_in_local:
-                logger.debug("Adding to local library: %s", slug)
                 missing_slugs.add(slug)
                 missing.append(
                     {'name': game['name'],
@@ -68,7 +67,7 @@ class Sync(object):
                      'updated': game['updated'],
                      'steamid': game['steamid']}
                 )
-        pga.add_games_bulk(missing)
+        pga.upsert_games_bulk(missing)
         logger.debug("%d games added", len(missing))
         return missing_slugs
 
@@ -81,18 +80,20 @@ class Sync(object):
         """
         if not remote_library:
             return set()
-        updated = set()
+        local_games = dict((game['slug'], game) for game in pga.get_games())
 
         # Get remote games (TODO: use this when switched API to DRF)
         # remote_games = get_games(sorted(local_slugs))
         # if not remote_games:
         #     return set()
 
+        synced = []
+        icons_to_sync = set()
         for game in remote_library:
             slug = game['slug']
             sync = False
             sync_icons = True
-            local_game = pga.get_game_by_slug(slug)
+            local_game = local_games.get(slug)
             if not local_game:
                 continue
 
@@ -110,18 +111,20 @@ class Sync(object):
             if not sync:
                 continue
 
-            logger.debug("Syncing details for %s" % slug)
-            pga.add_or_update(
-                local_game['name'], local_game['runner'], slug,
-                year=game['year'], updated=game['updated'],
-                steamid=game['steamid']
-            )
-
-            # Sync icons (TODO: Only update if icon actually updated)
+            synced.append({'slug': slug,
+                           'year': game['year'],
+                           'updated': game['updated'],
+                           'steamid': game['steamid']})
             if sync_icons:
-                resources.download_icon(slug, 'banner', overwrite=True)
-                resources.download_icon(slug, 'icon', overwrite=True)
-                updated.add(slug)
+                icons_to_sync.add(slug)
+
+        changed = pga.upsert_games_bulk(synced)
+
+        # Sync icons (TODO: Only update if icon actually updated)
+        updated = changed & icons_to_sync
+        for slug in updated:
+            resources.download_icon(slug, 'banner', overwrite=True)
+            resources.download_icon(slug, 'icon', overwrite=True)
 
         logger.debug("%d games updated", len(updated))
         return updated
@@ -133,6 +136,7 @@ class Sync(object):
         winesteamrunner = winesteam()
         installed = set()
         uninstalled = set()
+        synced = []
 
         # Get installed steamapps
         installed_steamapps = self._get_installed_steamapps(steamrunner)
@@ -150,8 +154,8 @@ class Sync(object):
                 if not installed_in_steam:  # (Linux Steam only)
                     continue
                 logger.debug("Setting %s as installed" % game_info['name'])
-                pga.add_or_update(game_info['name'], 'steam', slug,
-                                  installed=1)
+                synced.append({'slug': slug, 'runner': 'steam',
+                               'installed': 1})
                 game_config = config.LutrisConfig(runner_slug='steam',
                                                   game_slug=game_info['slug'])
                 game_config.raw_game_config.update({'appid': str(steamid)})
@@ -167,10 +171,9 @@ class Sync(object):
                 if runner == 'winesteam' and not winesteamrunner.is_installed():
                     continue
                 logger.debug("Setting %s as uninstalled" % game_info['name'])
-                pga.add_or_update(game_info['name'], '',
-                                  game_info['slug'],
-                                  installed=0)
+                synced.append({'slug': slug, 'runner': '', 'installed': 0})
                 uninstalled.add(slug)
+        pga.upsert_games_bulk(synced)
         return (installed, uninstalled)
 
     @staticmethod
@@ -189,10 +192,26 @@ class Sync(object):
                 appmanifest_path = os.path.join(
                     dirname, "appmanifest_%s.acf" % str(steamid)
                 )
-                with open(appmanifest_path, "r") as appmanifest_file:
-                    appmanifest = vdf_parse(appmanifest_file, {})
-                appstate = appmanifest.get('AppState') or {}
-                is_installed = appstate.get('LastOwner') or '0'
-                if not is_installed == '0':
+                if is_steamapp_installed(appmanifest_path):
                     installed.append(steamid)
         return installed
+
+
+# Installed state of the Steam apps by appmanifest path, along with the
+# mtime of the appmanifest it was read from.
+_steamapps_index = {}
+
+
+def is_steamapp_installed(appmanifest_path):
+    """Return whether an appmanifest is for an installed game, only parsing
+    it again when it changed."""
+    mtime = os.path.getmtime(appmanifest_path)
+    cached = _steamapps_index.get(appmanifest_path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with open(appmanifest_path, "r") as appmanifest_file:
+        appmanifest = vdf_parse(appmanifest_file, {})
+    appstate = appmanifest.get('AppState') or {}
+    is_installed = (appstate.get('LastOwner') or '0') != '0'
+    _steamapps_index[appmanifest_path] = (mtime, is_installed)
+    return is_installed
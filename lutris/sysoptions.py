@@ -12,13 +12,63 @@ oss_list = [
     ("aoss (OSS Wrapper for Alsa)", "aoss"),
 ]
 
-resolutions = display.get_resolutions()
-resolution_choices = zip(resolutions, resolutions)
-resolution_choices.insert(0, ("Keep current", 'off'))
 
-outputs = display.get_output_names()
-output_choices = zip(outputs, outputs)
-output_choices.insert(0, ("Off", 'off'))
+def cached_provider(function):
+    """Make function compute its result on its first call only.
+
+    Options can have a provider instead of a value for their 'choices',
+    'condition' and 'default' keys, so that the external commands needed to
+    compute them only run when the option is displayed.
+    """
+    cache = []
+
+    def provider():
+        if not cache:
+            cache.append(function())
+        return cache[0]
+    provider.__name__ = function.__name__
+    return provider
+
+
+def resolve(option, key, default=None):
+    """Return the value of an option's key, calling its provider if any."""
+    value = option.get(key, default)
+    if callable(value):
+        value = value()
+    return value
+
+
+@cached_provider
+def get_resolutions():
+    return display.get_resolutions()
+
+
+@cached_provider
+def get_resolution_choices():
+    resolutions = get_resolutions()
+    resolution_choices = zip(resolutions, resolutions)
+    resolution_choices.insert(0, ("Keep current", 'off'))
+    return resolution_choices
+
+
+@cached_provider
+def get_output_choices():
+    outputs = display.get_output_names()
+    output_choices = zip(outputs, outputs)
+    output_choices.insert(0, ("Off", 'off'))
+    return output_choices
+
+
+@cached_provider
+def get_terminal_apps():
+    return system.get_terminal_apps()
+
+
+def executable_condition(exec_name):
+    """Return a provider checking whether exec_name is installed."""
+    return cached_provider(lambda: system.find_executable(exec_name))
+
+
 system_options = [
     {
         'option': 'game_path',
@@ -51,7 +101,7 @@ system_options = [
         'option': 'primusrun',
         'type': 'bool',
         'default': False,
-        'condition': system.find_executable('primusrun'),
+        'condition': executable_condition('primusrun'),
         'label': 'Use primusrun (NVIDIA Optimus laptops)',
         'help': ("If you have installed the primus package, selecting this "
                  "option will run the game with the primusrun command, "
@@ -62,7 +112,7 @@ system_options = [
         'option': 'display',
         'type': 'choice',
         'label': 'Restrict to display',
-        'choices': output_choices,
+        'choices': get_output_choices,
         'default': 'off',
         'help': ("Only keep the selected screen active while the game is "
                  "running. \n"
@@ -73,7 +123,7 @@ system_options = [
         'option': 'resolution',
         'type': 'choice',
         'label': 'Switch resolution to',
-        'choices': resolution_choices,
+        'choices': get_resolution_choices,
         'default': 'off',
         'help': "Switch to this screen resolution while the game is running."
     },
@@ -89,8 +139,8 @@ system_options = [
         'option': 'terminal_app',
         'label': "Terminal application",
         'type': 'choice_with_entry',
-        'choices': system.get_terminal_apps(),
-        'default': system.get_default_terminal(),
+        'choices': get_terminal_apps,
+        'default': system.get_default_terminal,
         'advanced': True,
         'help': ("The terminal emulator to be run with the previous option."
                  "Choose from the list of detected terminal apps or enter "
@@ -121,7 +171,7 @@ system_options = [
         'label': 'Reset PulseAudio',
         'default': False,
         'advanced': True,
-        'condition': system.find_executable('pulseaudio'),
+        'condition': executable_condition('pulseaudio'),
         'help': "Restart PulseAudio before launching the game."
     },
     {
@@ -138,7 +188,7 @@ system_options = [
         'type': 'string',
         'label': 'xboxdrv config',
         'advanced': True,
-        'condition': system.find_executable('xboxdrv'),
+        'condition': executable_condition('xboxdrv'),
         'help': ("Command line options for xboxdrv, a driver for XBOX 360"
                  "controllers. Requires the xboxdrv package installed.")
     }
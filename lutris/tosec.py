@@ -19,11 +19,12 @@
 #    Mathieu Comandon <strider@strycore.com>
 
 import re
-import sqlite3
 import hashlib
 import os.path
 import datetime
 
+from lutris.util import sql
+
 STANDARD_CODES = {
     "[a]":   "Alternate",
     "[p]":   "Pirate",
@@ -51,7 +52,6 @@ class TOSEC:
         self.path = os.path.join(directory, "tosec.db")
 
         # Init the database
-        self.db = sqlite3.connect(self.path)
         self.db.execute('''CREATE TABLE IF NOT EXISTS systems
                           (
                             id TEXT PRIMARY KEY,
@@ -77,16 +77,16 @@ class TOSEC:
                             FOREIGN KEY(game) REFERENCES game(id)
                           )''')
 
+    @property
+    def db(self):
+        return sql.get_connection(self.path)
+
     def __enter__(self):
         print 'enter'
         return self
 
     def __exit__(self, type, value, traceback):
         print 'exit'
-        self.db.close()
-
-    def __del__(self):
-        self.db.close()
 
     def parse_file(self, file, system):
         ''' Add a data file for the given system and update the database if
@@ -96,7 +96,10 @@ class TOSEC:
         '''
         words = tosec_to_words(file)
         info, games = get_games_from_words(words)
+        with sql.db_transaction(self.path):
+            return self._add_games(info, games, system)
 
+    def _add_games(self, info, games, system):
         # If the info don't have a version, it is not valid and the file
         # shouldn't be added
         if not 'version' in info:
@@ -185,8 +188,6 @@ class TOSEC:
                     'VALUES (NULL, ?, ?, ?, ?, ?, ?)',
                     rom_info
                 )
-
-        self.db.commit()
         return True
 
     def get_rom_id(self, rom):
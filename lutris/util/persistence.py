@@ -0,0 +1,131 @@
+"""Delayed and atomic writes of the configuration files."""
+import os
+import time
+import atexit
+import threading
+
+from lutris.util.log import logger
+
+# Seconds without any new write before the pending files are written
+WRITE_DELAY = 1.0
+
+
+def write_atomic(path, content):
+    """Replace the content of path, readers see either the old or the new
+    version of the file, never a partially written one."""
+    tmp_path = "%s.%d.tmp" % (path, os.getpid())
+    mode = None
+    if os.path.exists(path):
+        mode = os.stat(path).st_mode & 0o777
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+    try:
+        with os.fdopen(fd, 'wb') as tmp_file:
+            tmp_file.write(content)
+            tmp_file.flush()
+            os.fsync(tmp_file.fileno())
+        if mode is not None:
+            os.chmod(tmp_path, mode)
+        os.rename(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class WriteBehind(object):
+    """Merge the writes made to files in a short time, only their last
+    content is written, once no write happened for `delay` seconds.
+
+    The content is a string or, when a serialize function is given, any
+    object that is only serialized when written. Such objects must not be
+    modified after being scheduled.
+    """
+    def __init__(self, delay=WRITE_DELAY):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.pending = {}
+        self.last_change = 0
+        self.timer = None
+        self.scheduled = 0
+        self.written = 0
+
+    def schedule(self, path, content, serialize=None):
+        with self.lock:
+            self.pending[path] = (content, serialize)
+            self.scheduled += 1
+            self.last_change = time.time()
+            if self.timer is None:
+                self._start_timer(self.delay)
+
+    def _start_timer(self, delay):
+        self.timer = threading.Timer(delay, self._on_timeout)
+        self.timer.daemon = True
+        self.timer.start()
+
+    def _on_timeout(self):
+        with self.lock:
+            self.timer = None
+            remaining = self.last_change + self.delay - time.time()
+            if remaining > 0:
+                self._start_timer(remaining)
+                return
+        self.flush()
+
+    def is_pending(self, path):
+        return path in self.pending
+
+    def get_pending(self, path):
+        """Return the content waiting to be written to path, None if there
+        is nothing pending."""
+        entry = self.pending.get(path)
+        return entry[0] if entry else None
+
+    def cancel(self, path):
+        """Forget the pending write of path, the file is left untouched."""
+        with self.lock:
+            self.pending.pop(path, None)
+
+    def flush(self, path=None):
+        """Write the pending files now, or only path if given."""
+        with self.flush_lock:
+            with self.lock:
+                if path is None:
+                    entries = self.pending.items()
+                elif path in self.pending:
+                    entries = [(path, self.pending[path])]
+                else:
+                    entries = []
+            for filepath, entry in entries:
+                content, serialize = entry
+                try:
+                    if serialize:
+                        content = serialize(content)
+                    write_atomic(filepath, content)
+                except (IOError, OSError) as ex:
+                    # The file stays pending, it is written again on the
+                    # next flush
+                    logger.error("Failed to write %s: %s", filepath, ex)
+                    continue
+                with self.lock:
+                    # Files changed in the meantime stay pending
+                    if self.pending.get(filepath) is entry:
+                        del self.pending[filepath]
+                    self.written += 1
+            with self.lock:
+                if not self.pending and self.timer:
+                    self.timer.cancel()
+                    self.timer = None
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                'scheduled': self.scheduled,
+                'written': self.written,
+                'pending': len(self.pending),
+                'saved': self.scheduled - self.written - len(self.pending),
+            }
+
+
+WRITER = WriteBehind()
+atexit.register(WRITER.flush)
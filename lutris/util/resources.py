@@ -7,6 +7,9 @@ from lutris.util import http
 BANNER = "banner"
 ICON = "icon"
 
+# Functions called with the game and the icon type when an icon is written
+icon_change_callbacks = []
+
 
 def get_icon_path(game, icon_type):
     if icon_type == BANNER:
@@ -57,6 +60,9 @@ def download_icon(game, icon_type, overwrite=False, callback=None,
     icon_path = get_icon_path(game, icon_type)
     icon_downloaded = http.download_asset(icon_url, icon_path, overwrite,
                                           stop_request=stop_request)
+    if icon_downloaded:
+        for icon_change_callback in icon_change_callbacks:
+            icon_change_callback(game, icon_type)
     if icon_downloaded and callback:
         logger.debug("Downloaded %s for %s" % (icon_type, game))
         callback(game)
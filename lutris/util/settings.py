@@ -1,5 +1,8 @@
 import os
 import ConfigParser
+from cStringIO import StringIO
+
+from lutris.util.persistence import WRITER
 
 
 class SettingsIO(object):
@@ -24,5 +27,7 @@ class SettingsIO(object):
             self.config.add_section(section)
         self.config.set(section, key, str(value))
 
-        with open(self.config_file, 'wb') as config_file:
-            self.config.write(config_file)
+        # Repeated changes are written to disk in one go
+        content = StringIO()
+        self.config.write(content)
+        WRITER.schedule(self.config_file, content.getvalue())
@@ -1,18 +1,115 @@
+"""SQLite helpers backed by a per-thread pool of persistent connections."""
+import os
 import sqlite3
+import threading
 
+# Applied once to each new connection.
+PRAGMAS = (
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('cache_size', -8192),  # In KiB
+    ('mmap_size', 67108864),
+    ('temp_store', 'MEMORY'),
+)
 
-class db_cursor(object):
+_local = threading.local()
+_generation = {'value': 0}
+
+
+class _PooledConnection(object):
+    """A connection owned by a single thread, with its transaction depth."""
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.generation = _generation['value']
+        # Autocommit mode: transactions are only opened by `db_transaction`.
+        self.conn = sqlite3.connect(db_path, isolation_level=None)
+        for pragma, value in PRAGMAS:
+            self.conn.execute("PRAGMA {0}={1}".format(pragma, value))
+        self.file_id = _get_file_id(db_path)
+        self.depth = 0
+
+    def is_stale(self):
+        """Return True if the database file was removed or replaced."""
+        if self.generation != _generation['value']:
+            return True
+        return _get_file_id(self.db_path) != self.file_id
+
+    def close(self):
+        self.conn.close()
+
+
+def _get_file_id(db_path):
+    try:
+        stat = os.stat(db_path)
+    except OSError:
+        return None
+    return (stat.st_dev, stat.st_ino)
+
+
+def _get_pool():
+    pool = getattr(_local, 'connections', None)
+    if pool is None:
+        pool = _local.connections = {}
+    return pool
+
+
+def _get_pooled_connection(db_path):
+    pool = _get_pool()
+    pooled = pool.get(db_path)
+    if pooled and pooled.depth == 0 and pooled.is_stale():
+        pooled.close()
+        pooled = None
+    if not pooled:
+        pooled = pool[db_path] = _PooledConnection(db_path)
+    return pooled
+
+
+def get_connection(db_path):
+    """Return the calling thread's persistent connection to `db_path`."""
+    return _get_pooled_connection(db_path).conn
+
+
+def close_connections(db_path=None):
+    """Close the pooled connections of the calling thread.
+
+    Connections held by other threads are reopened on their next use.
+    This must be called before removing or replacing a database file.
+    """
+    _generation['value'] += 1
+    pool = _get_pool()
+    for path in pool.keys():
+        if db_path and path != db_path:
+            continue
+        pool.pop(path).close()
+
+
+class db_transaction(object):
+    """Run the enclosed statements in a single transaction.
+
+    Transactions can be nested, only the outermost one commits (or rolls back
+    if an exception is raised).
+    """
     def __init__(self, db_path):
         self.db_path = db_path
 
     def __enter__(self):
-        self.db_conn = sqlite3.connect(self.db_path)
-        cursor = self.db_conn.cursor()
-        return cursor
+        self.pooled = _get_pooled_connection(self.db_path)
+        if self.pooled.depth == 0:
+            self.pooled.conn.execute("BEGIN")
+        self.pooled.depth += 1
+        return self.pooled.conn.cursor()
 
     def __exit__(self, type, value, traceback):
-        self.db_conn.commit()
-        self.db_conn.close()
+        self.pooled.depth -= 1
+        if self.pooled.depth == 0:
+            if type is None:
+                self.pooled.conn.execute("COMMIT")
+            else:
+                self.pooled.conn.execute("ROLLBACK")
+
+
+class db_cursor(db_transaction):
+    """Cursor on the pooled connection, committed on exit."""
 
 
 def db_insert(db_path, table, fields):
@@ -46,6 +143,26 @@ def db_insert_bulk(db_path, table, fields_bulk):
         )
 
 
+def db_upsert_bulk(db_path, table, fields_bulk, conflict_field):
+    """Insert several rows, updating the existing ones when they conflict on
+    the unique `conflict_field`. The dicts must have an identical set of keys.
+
+    :type fields_bulk: list of dicts
+    """
+    columns = fields_bulk[0].keys()
+    placeholders = ("?, " * len(columns))[:-2]
+    updates = ", ".join(["{0}=excluded.{0}".format(column)
+                         for column in columns if column != conflict_field])
+    query = "insert into {0}({1}) values ({2}) on conflict({3}) ".format(
+        table, ", ".join(columns), placeholders, conflict_field
+    )
+    query += "do update set " + updates if updates else "do nothing"
+    rows = [_decode_utf8_values([fields[column] for column in columns])
+            for fields in fields_bulk]
+    with db_cursor(db_path) as cursor:
+        cursor.executemany(query, rows)
+
+
 def db_update(db_path, table, updated_fields, row):
     """ update `table` with the values given in the dict `values` on the
         condition given with the tuple `row`
@@ -66,30 +183,39 @@ def db_delete(db_path, table, field, value):
                        (value,))
 
 
-def db_select(db_path, table, fields=None, condition=None):
+def db_iter_select(db_path, table, fields=None, conditions=None,
+                   order_by=None):
+    """Return an iterator over the selected rows, as sqlite3.Row objects.
+
+    Rows are fetched from the database as the iterator is consumed.
+
+    :param dict conditions: Column names and the values they must be equal to
+    """
     if fields:
         columns = ", ".join(fields)
     else:
         columns = "*"
-    with db_cursor(db_path) as cursor:
-        if condition:
-            assert len(condition) == 2
-            cursor.execute(
-                "SELECT {0} FROM {1} where {2}=?".format(
-                    columns, table, condition[0]
-                ), (condition[1], )
-            )
-        else:
-            cursor.execute("SELECT {0} FROM {1}".format(columns, table))
-        rows = cursor.fetchall()
-        column_names = [column[0] for column in cursor.description]
-    results = []
-    for row in rows:
-        row_data = {}
-        for index, column in enumerate(column_names):
-            row_data[column] = row[index]
-        results.append(row_data)
-    return results
+    query = "SELECT {0} FROM {1}".format(columns, table)
+    params = ()
+    if conditions:
+        query += " where " + " AND ".join(
+            ["{0}=?".format(field) for field in conditions.keys()]
+        )
+        params = tuple(conditions.values())
+    if order_by:
+        query += " ORDER BY {0}".format(order_by)
+    cursor = get_connection(db_path).cursor()
+    cursor.row_factory = sqlite3.Row
+    return cursor.execute(query, params)
+
+
+def db_select(db_path, table, fields=None, condition=None):
+    conditions = None
+    if condition:
+        assert len(condition) == 2
+        conditions = {condition[0]: condition[1]}
+    return [dict(zip(row.keys(), row))
+            for row in db_iter_select(db_path, table, fields, conditions)]
 
 
 def _decode_utf8_values(values_list):
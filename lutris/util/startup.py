@@ -0,0 +1,136 @@
+"""Measure where the time goes while Lutris starts."""
+import sys
+import time
+import __builtin__
+from contextlib import contextmanager
+
+# Startup time budget, in milliseconds, used by --profile-startup
+DEFAULT_BUDGET = {'total': 2000}
+
+
+def parse_budget(value):
+    """Parse a budget given as milliseconds for the whole startup, or as
+    comma separated phase=milliseconds pairs, 'total' being the startup."""
+    budget = {}
+    for part in value.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '=' in part:
+            name, limit = part.split('=', 1)
+        else:
+            name, limit = 'total', part
+        try:
+            budget[name.strip()] = float(limit)
+        except ValueError:
+            raise ValueError("Invalid startup budget: %s" % part)
+    return budget
+
+
+class StartupProfiler(object):
+    """Record the time spent importing modules and in each startup phase.
+
+    It does nothing until started, phases can be marked unconditionally.
+    """
+    def __init__(self):
+        self.enabled = False
+        self.start_time = None
+        self.end_time = None
+        self.imports = {}
+        self.phases = []
+        self._import_stack = []
+        self._original_import = None
+
+    def start(self):
+        self.enabled = True
+        self.start_time = time.time()
+        self._original_import = __builtin__.__import__
+        __builtin__.__import__ = self._timed_import
+
+    def stop(self):
+        if not self.enabled:
+            return
+        self.end_time = time.time()
+        if __builtin__.__import__ == self._timed_import:
+            __builtin__.__import__ = self._original_import
+
+    def _timed_import(self, name, *args, **kwargs):
+        module_count = len(sys.modules)
+        self._import_stack.append(0)
+        start = time.time()
+        try:
+            return self._original_import(name, *args, **kwargs)
+        finally:
+            duration = time.time() - start
+            children = self._import_stack.pop()
+            if self._import_stack:
+                self._import_stack[-1] += duration
+            # Only imports that loaded new modules are worth reporting
+            if len(sys.modules) > module_count:
+                total, own = self.imports.get(name, (0, 0))
+                self.imports[name] = (total + duration,
+                                      own + duration - children)
+
+    @contextmanager
+    def phase(self, name):
+        """Measure the time spent in a block of code."""
+        if not self.enabled:
+            yield
+            return
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.time() - start))
+
+    def add_phase(self, name, duration):
+        """Record a phase measured elsewhere, duration being in seconds."""
+        if self.enabled:
+            self.phases.append((name, duration))
+
+    def get_durations(self):
+        """Return the duration of each phase and of the whole startup, in
+        milliseconds."""
+        durations = {}
+        for name, duration in self.phases:
+            durations[name] = durations.get(name, 0) + duration * 1000
+        end_time = self.end_time or time.time()
+        durations['total'] = (end_time - self.start_time) * 1000
+        return durations
+
+    def check_budget(self, budget):
+        """Return the list of (phase, duration, limit) over budget."""
+        durations = self.get_durations()
+        return [(name, durations[name], limit)
+                for name, limit in sorted(budget.iteritems())
+                if durations.get(name, 0) > limit]
+
+    def get_report(self, budget=None, top=30):
+        durations = self.get_durations()
+        lines = ["Startup: %.1f ms" % durations['total'], "", "Phases:"]
+        for name, duration in self.phases:
+            lines.append("  %-30s %8.1f ms" % (name, duration * 1000))
+        lines += ["", "Slowest imports (own time, with dependencies):"]
+        imports = sorted(self.imports.iteritems(),
+                         key=lambda item: item[1][1], reverse=True)
+        for name, (total, own) in imports[:top]:
+            lines.append("  %-40s %8.1f ms %8.1f ms"
+                         % (name, own * 1000, total * 1000))
+        if budget:
+            lines += ["", "Budget:"]
+            exceeded = self.check_budget(budget)
+            for name, limit in sorted(budget.iteritems()):
+                status = ('EXCEEDED' if name in [item[0] for item in exceeded]
+                          else 'ok')
+                lines.append("  %-30s %8.1f ms / %8.1f ms %s"
+                             % (name, durations.get(name, 0), limit, status))
+        return "\n".join(lines) + "\n"
+
+    def write_report(self, path, budget=None):
+        report = self.get_report(budget)
+        with open(path, 'w') as report_file:
+            report_file.write(report)
+        return report
+
+
+PROFILER = StartupProfiler()
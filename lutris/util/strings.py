@@ -1,6 +1,19 @@
 import unicodedata
 import re
 
+# Articles ignored at the beginning of names by get_sort_key
+ARTICLES = ('the', 'a', 'an')
+# Numbers are padded to this width so they sort by value
+NUMBER_WIDTH = 10
+
+
+def normalize(value):
+    """Strip accents and special characters from a string and lowercase it."""
+    if isinstance(value, str):
+        value = value.decode('UTF-8')
+    value = unicodedata.normalize('NFKD', value).encode('ascii', 'ignore')
+    return unicode(re.sub('[^\w\s-]', '', value).strip().lower())
+
 
 def slugify(value):
     """Remove special characters from a string and slugify it.
@@ -8,10 +21,40 @@ def slugify(value):
     Normalizes string, converts to lowercase, removes non-alpha characters,
     and converts spaces to hyphens.
     """
-    value = value.decode('UTF-8')
-    value = unicodedata.normalize('NFKD', value).encode('ascii', 'ignore')
-    value = unicode(re.sub('[^\w\s-]', '', value).strip().lower())
-    return re.sub('[-\s]+', '-', value)
+    return re.sub('[-\s]+', '-', normalize(value))
+
+
+def get_search_key(value):
+    """Return the words of a string, lowercased, without accents nor special
+    characters, separated by spaces.
+
+    Unlike slugify, letters outside of the ASCII range are kept, only the
+    accents of latin letters are stripped.
+    """
+    if isinstance(value, str):
+        value = value.decode('UTF-8')
+    chars = []
+    for char in unicodedata.normalize('NFKD', value):
+        if unicodedata.combining(char) and chars and ord(chars[-1]) < 128:
+            continue
+        chars.append(char)
+    value = unicodedata.normalize('NFC', u''.join(chars))
+    value = re.sub(r'[^\w\s-]', '', value, flags=re.UNICODE).strip().lower()
+    return re.sub(r'[-\s]+', ' ', value, flags=re.UNICODE).encode('UTF-8')
+
+
+def get_sort_key(value, ignore_articles=False):
+    """Return a key sorting names case-insensitively and numbers by value,
+    "Doom 2" before "Doom 10".
+
+    Leading articles are skipped if ignore_articles is set.
+    """
+    words = get_search_key(value).split()
+    if ignore_articles and len(words) > 1 and words[0] in ARTICLES:
+        words = words[1:]
+    key = re.sub(r'\d+', lambda match: match.group().zfill(NUMBER_WIDTH),
+                 " ".join(words))
+    return key or value.lower()
 
 
 def add_url_tags(text):
@@ -38,10 +38,96 @@ def get_md5_hash(filename):
     return md5.hexdigest()
 
 
+def _is_executable(path):
+    return os.path.isfile(path) and os.access(path, os.X_OK)
+
+
+class ExecutableResolver(object):
+    """Find executables in PATH, like `which` does, without running it.
+
+    Results are kept until PATH changes or one of its directories is
+    modified.
+    """
+    def __init__(self):
+        self.path = None
+        self.dir_mtimes = None
+        self.cache = {}
+
+    def get_dirs(self):
+        path = os.environ.get('PATH', os.defpath)
+        dirs = [directory for directory in path.split(os.pathsep)
+                if directory]
+        mtimes = []
+        for directory in dirs:
+            try:
+                mtimes.append(os.stat(directory).st_mtime)
+            except OSError:
+                mtimes.append(None)
+        if path != self.path or mtimes != self.dir_mtimes:
+            self.path = path
+            self.dir_mtimes = mtimes
+            self.cache = {}
+        return dirs
+
+    def find(self, exec_name):
+        """Return the path of an executable, None if it isn't found."""
+        if os.sep in exec_name:
+            return exec_name if _is_executable(exec_name) else None
+        dirs = self.get_dirs()
+        if exec_name not in self.cache:
+            self.cache[exec_name] = None
+            for directory in dirs:
+                path = os.path.join(directory, exec_name)
+                if _is_executable(path):
+                    self.cache[exec_name] = path
+                    break
+        return self.cache[exec_name]
+
+    def find_all(self, exec_names):
+        """Return the paths of several executables as a dict, looking them
+        up with a single listing of each PATH directory."""
+        dirs = self.get_dirs()
+        results = {}
+        missing = set()
+        for exec_name in exec_names:
+            if os.sep in exec_name:
+                results[exec_name] = self.find(exec_name)
+            elif exec_name in self.cache:
+                results[exec_name] = self.cache[exec_name]
+            else:
+                missing.add(exec_name)
+        for directory in dirs:
+            if not missing:
+                break
+            try:
+                filenames = missing.intersection(os.listdir(directory))
+            except OSError:
+                continue
+            for exec_name in filenames:
+                path = os.path.join(directory, exec_name)
+                if _is_executable(path):
+                    self.cache[exec_name] = results[exec_name] = path
+                    missing.discard(exec_name)
+        for exec_name in missing:
+            self.cache[exec_name] = results[exec_name] = None
+        return results
+
+
+_resolver = ExecutableResolver()
+
+
 def find_executable(exec_name):
+    """Return the path of exec_name, an empty string if it isn't found."""
     if not exec_name:
         raise ValueError("find_executable: exec_name required")
-    return execute(['which', exec_name])
+    return _resolver.find(exec_name) or ''
+
+
+def find_executables(exec_names):
+    """Return a dict of the paths of exec_names, None for the missing ones."""
+    if not all(exec_names):
+        raise ValueError("find_executables: exec_names required")
+    return _resolver.find_all(exec_names)
 
 
 def get_pid(program, multiple=False):
@@ -198,11 +284,8 @@ def get_terminal_apps():
         'terminology', 'termite', 'urxvt', 'wterm', 'xfce4-terminal', 'xterm',
         'yuakuake',
     ]
-    installed_terms = []
-    for exe in candidates:
-        if find_executable(exe):
-            installed_terms.append(exe)
-    return installed_terms
+    paths = find_executables(candidates)
+    return [exe for exe in candidates if paths[exe]]
 
 
 def get_default_terminal():
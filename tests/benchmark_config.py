@@ -0,0 +1,31 @@
+"""Time the construction of game configs."""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+from benchmark_utils import timed
+from lutris.config import LutrisConfig
+
+GAMES = 1000
+RUNNERS = ["linux", "wine", "steam", "snes9x", "mednafen", "dosbox"]
+
+
+@timed(GAMES, 'game')
+def build_configs_cold_registry():
+    """Recompute the runner options for every game."""
+    for i in range(GAMES):
+        LutrisConfig._option_registry.clear()
+        LutrisConfig(runner_slug=RUNNERS[i % len(RUNNERS)],
+                     game_slug="game-%d" % i)
+
+
+@timed(GAMES, 'game')
+def build_configs():
+    for i in range(GAMES):
+        LutrisConfig(runner_slug=RUNNERS[i % len(RUNNERS)],
+                     game_slug="game-%d" % i)
+
+
+if __name__ == '__main__':
+    build_configs_cold_registry()
+    build_configs()
@@ -0,0 +1,51 @@
+"""Time full-text searches of a 20k games library."""
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+from lutris import pga
+from lutris.util import sql
+
+LIBRARY_SIZE = 20000
+SEARCHES = ["z", "ze", "zel", "zelda", "quake 3", "legend of", "wine"]
+RUNS = 20
+
+WORDS = ["Legend", "Zelda", "Quake", "Doom", "Arena", "of", "the", "Dark",
+         "Return", "Island", "Monkey", "Space", "Quest", "Kings", "Heroes"]
+RUNNERS = ["linux", "wine", "steam", "snes9x", "mednafen", "dosbox"]
+
+
+def create_library():
+    games = []
+    for i in range(LIBRARY_SIZE):
+        name = " ".join([WORDS[(i * factor) % len(WORDS)]
+                         for factor in (1, 3, 7)]) + " %d" % i
+        games.append({'name': name, 'slug': "game-%d" % i,
+                      'runner': RUNNERS[i % len(RUNNERS)]})
+    pga.upsert_games_bulk(games)
+
+
+def benchmark_search(query, **kwargs):
+    start_time = time.time()
+    for _ in range(RUNS):
+        results = pga.search_games(query, **kwargs)
+    total = time.time() - start_time
+    print "%-12s %-30s %6d results %8.2f ms" % (
+        query, kwargs, len(results), total / RUNS * 1000
+    )
+
+
+if __name__ == '__main__':
+    db_dir = tempfile.mkdtemp()
+    pga.PGA_DB = os.path.join(db_dir, 'pga.db')
+    pga.syncdb()
+    create_library()
+    for query in SEARCHES:
+        benchmark_search(query, ranked=False)
+        benchmark_search(query, limit=20)
+    sql.close_connections()
+    for filename in os.listdir(db_dir):
+        os.remove(os.path.join(db_dir, filename))
+    os.rmdir(db_dir)
@@ -0,0 +1,58 @@
+"""Time the sorting of a 20k games store, with a Python comparison function
+and with GTK's sort on a precomputed key column."""
+import os
+import sys
+
+from gi.repository import Gtk
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+from benchmark_utils import timed
+from lutris.util.strings import get_sort_key
+
+STORE_SIZE = 20000
+COL_NAME, COL_SORT_KEY = range(2)
+
+WORDS = ["Legend", "Zelda", "Quake", "Doom", "Arena", "of", "the", "Dark",
+         "Return", "Island", "Monkey", "Space", "Quest", "Kings", "Heroes"]
+
+
+def get_names():
+    return [" ".join([WORDS[(i * factor) % len(WORDS)]
+                      for factor in (7, 3, 1)]) + " %d" % i
+            for i in range(STORE_SIZE)]
+
+
+def compare_names(store, a_iter, b_iter, _user_data):
+    a_name = store.get(a_iter, COL_NAME)
+    b_name = store.get(b_iter, COL_NAME)
+    return cmp(a_name, b_name)
+
+
+def create_store(names, sort_keys):
+    store = Gtk.ListStore(str, str)
+    for name, sort_key in zip(names, sort_keys):
+        store.append((name, sort_key))
+    return store
+
+
+@timed(STORE_SIZE, 'game')
+def compute_sort_keys(names):
+    return [get_sort_key(name) for name in names]
+
+
+@timed()
+def sort_with_function(store):
+    store.set_default_sort_func(compare_names)
+    store.set_sort_column_id(-1, Gtk.SortType.ASCENDING)
+
+
+@timed()
+def sort_with_key_column(store):
+    store.set_sort_column_id(COL_SORT_KEY, Gtk.SortType.ASCENDING)
+
+
+if __name__ == '__main__':
+    names = get_names()
+    sort_keys = compute_sort_keys(names)
+    sort_with_function(create_store(names, sort_keys))
+    sort_with_key_column(create_store(names, sort_keys))
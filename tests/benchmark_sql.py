@@ -0,0 +1,51 @@
+"""Compare the per-query cost of pooled connections with one-shot ones."""
+import os
+import sys
+import sqlite3
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+from benchmark_utils import timed
+from lutris.util import sql
+
+QUERIES = 3000
+
+
+def create_db(db_path):
+    with sql.db_cursor(db_path) as cursor:
+        cursor.execute("CREATE TABLE games "
+                       "(id INTEGER PRIMARY KEY, name TEXT, slug TEXT)")
+        cursor.execute("CREATE UNIQUE INDEX games_slug ON games (slug)")
+    sql.db_insert_bulk(db_path, 'games', [
+        {'name': "Game %d" % i, 'slug': "game-%d" % i}
+        for i in range(QUERIES)
+    ])
+
+
+@timed(QUERIES, 'query')
+def one_shot_connections(db_path):
+    for i in range(QUERIES):
+        db_conn = sqlite3.connect(db_path)
+        cursor = db_conn.cursor()
+        cursor.execute("SELECT * FROM games where slug=?", ("game-%d" % i, ))
+        cursor.fetchall()
+        db_conn.commit()
+        db_conn.close()
+
+
+@timed(QUERIES, 'query')
+def pooled_connections(db_path):
+    for i in range(QUERIES):
+        sql.db_select(db_path, 'games', condition=('slug', "game-%d" % i))
+
+
+if __name__ == '__main__':
+    db_dir = tempfile.mkdtemp()
+    db_path = os.path.join(db_dir, 'pga.db')
+    create_db(db_path)
+    one_shot_connections(db_path)
+    pooled_connections(db_path)
+    sql.close_connections()
+    for filename in os.listdir(db_dir):
+        os.remove(os.path.join(db_dir, filename))
+    os.rmdir(db_dir)
@@ -0,0 +1,61 @@
+"""Time the sync of a synthetic remote library into the PGA."""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+from benchmark_utils import timed
+from lutris import pga
+from lutris.sync import Sync
+from lutris.util import resources, sql
+
+LIBRARY_SIZE = 10000
+
+
+def get_remote_library(updated):
+    return [{'name': u"Game %d" % i,
+             'slug': u"game-%d" % i,
+             'year': 1990 + i % 25,
+             'updated': updated,
+             'steamid': i}
+            for i in range(LIBRARY_SIZE)]
+
+
+@timed()
+def sync_missing_games(remote_library):
+    remote_slugs = set([game['slug'] for game in remote_library])
+    Sync.sync_missing_games(remote_slugs, remote_library)
+
+
+@timed()
+def sync_game_details_per_game(remote_library):
+    """Query and update each game on its own, as syncs used to do."""
+    for game in remote_library:
+        local_game = pga.get_game_by_slug(game['slug'])
+        if game['updated'] > local_game['updated']:
+            pga.add_or_update(
+                local_game['name'], local_game['runner'], game['slug'],
+                year=game['year'], updated=game['updated'],
+                steamid=game['steamid']
+            )
+
+
+@timed()
+def sync_game_details_bulk(remote_library):
+    Sync.sync_game_details(remote_library)
+
+
+if __name__ == '__main__':
+    resources.download_icon = lambda *args, **kwargs: None
+    db_dir = tempfile.mkdtemp()
+    pga.PGA_DB = os.path.join(db_dir, 'pga.db')
+    pga.syncdb()
+
+    sync_missing_games(get_remote_library(u"2015-01-01 00:00:00"))
+    sync_game_details_per_game(get_remote_library(u"2015-02-01 00:00:00"))
+    sync_game_details_bulk(get_remote_library(u"2015-03-01 00:00:00"))
+
+    sql.close_connections()
+    for filename in os.listdir(db_dir):
+        os.remove(os.path.join(db_dir, filename))
+    os.rmdir(db_dir)
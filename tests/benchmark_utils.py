@@ -0,0 +1,20 @@
+"""Helpers shared by the benchmarks."""
+import time
+
+
+def timed(count=None, unit=None):
+    """Decorator printing the time a function took, per unit of work when
+    the function handles `count` units."""
+    def decorator(function):
+        def _wrapped(*args, **kwargs):
+            start_time = time.time()
+            retval = function(*args, **kwargs)
+            total = time.time() - start_time
+            if count:
+                print "%-30s %8.1f us/%s" % (function.__name__,
+                                             total / count * 1000000, unit)
+            else:
+                print "%-30s %8.3f s" % (function.__name__, total)
+            return retval
+        return _wrapped
+    return decorator
@@ -1,6 +1,191 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from mock import patch
+
+from lutris.util import sql
 from lutris.util.log import logger
+from lutris import config, configstore, sysoptions
 from lutris.config import LutrisConfig
 
+
+class TestYamlCache(TestCase):
+    def setUp(self):
+        _fd, self.path = tempfile.mkstemp(suffix='.yml')
+        os.close(_fd)
+        config.write_yaml_to_file(self.path, {'system': {'foo': 'bar'}})
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_unchanged_file_is_not_parsed_again(self):
+        config.read_yaml_from_file(self.path)
+        signature, content = config._yaml_cache[self.path]
+        content['system']['foo'] = 'cached'
+        content = config.read_yaml_from_file(self.path)
+        self.assertEqual(content['system']['foo'], 'cached')
+
+    def test_changed_file_is_parsed_again(self):
+        config.read_yaml_from_file(self.path)
+        config.write_yaml_to_file(self.path, {'system': {'foo': 'baz'}})
+        content = config.read_yaml_from_file(self.path)
+        self.assertEqual(content['system']['foo'], 'baz')
+
+    def test_pending_config_is_read_back(self):
+        config.write_config_file(self.path, {'system': {'foo': 'pending'}})
+        content = config.read_config_file(self.path)
+        self.assertEqual(content['system']['foo'], 'pending')
+        config.WRITER.flush(self.path)
+        self.assertFalse(config.WRITER.is_pending(self.path))
+        content = config.read_yaml_from_file(self.path)
+        self.assertEqual(content['system']['foo'], 'pending')
+
+    def test_returned_content_can_be_modified(self):
+        content = config.read_yaml_from_file(self.path)
+        content['system']['foo'] = 'modified'
+        content = config.read_yaml_from_file(self.path)
+        self.assertEqual(content['system']['foo'], 'bar')
+
+
+class TestLayeredConfig(TestCase):
+    def setUp(self):
+        self.game = {'resolution': '1920x1080'}
+        self.system = {'resolution': '800x600', 'terminal': True}
+        self.config = config.LayeredConfig([('game', self.game),
+                                            ('system', self.system)])
+
+    def test_highest_level_wins(self):
+        self.assertEqual(self.config['resolution'], '1920x1080')
+        self.assertEqual(self.config.get('terminal'), True)
+        self.assertEqual(self.config.get_level('resolution'), 'game')
+        self.assertEqual(self.config.get_level('terminal'), 'system')
+        self.assertEqual(sorted(self.config), ['resolution', 'terminal'])
+
+    def test_levels_are_not_copied(self):
+        self.system['reset_pulse'] = True
+        self.assertIn('reset_pulse', self.config)
+        del self.game['resolution']
+        self.assertEqual(self.config['resolution'], '800x600')
+
+    def test_writes_go_to_highest_level(self):
+        self.config['terminal'] = False
+        self.assertEqual(self.game['terminal'], False)
+        self.assertEqual(self.system['terminal'], True)
+
+
+class TestOptionProviders(TestCase):
+    def test_options_are_loaded_without_running_commands(self):
+        with patch.object(LutrisConfig, '_option_registry', {}):
+            with patch('subprocess.Popen') as popen:
+                popen.side_effect = AssertionError("command run")
+                lutris_config = LutrisConfig(runner_slug='wine')
+                lutris_config.options_as_dict('runner')
+        self.assertNotIn('terminal_app', lutris_config.system_config)
+
+    def test_providers_are_resolved_once(self):
+        calls = []
+
+        @sysoptions.cached_provider
+        def get_choices():
+            calls.append(True)
+            return [('Off', 'off')]
+
+        option = {'option': 'display', 'choices': get_choices}
+        self.assertEqual(sysoptions.resolve(option, 'choices'),
+                         [('Off', 'off')])
+        sysoptions.resolve(option, 'choices')
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(sysoptions.resolve(option, 'condition', True))
+
+
+class TestConfigStore(TestCase):
+    def setUp(self):
+        self.config_dir = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.config_dir, 'games'))
+        self.patches = [
+            patch.object(configstore, 'CONFIG_DIR', self.config_dir),
+            patch.object(configstore, 'CONFIG_DB',
+                         os.path.join(self.config_dir, 'config.db')),
+            patch.object(configstore, 'is_enabled', return_value=True),
+        ]
+        for patcher in self.patches:
+            patcher.start()
+        configstore.syncdb()
+        self.quake_path = os.path.join(self.config_dir, 'games/quake.yml')
+        self.quake = {
+            'game': {'exe': 'quake.exe', 'args': ['-width', 1024]},
+            'wine': {'version': '1.7.50'},
+            'system': {'terminal': True, 'prefix_command': u'\xe9'},
+        }
+
+    def tearDown(self):
+        for patcher in self.patches:
+            patcher.stop()
+        sql.close_connections()
+        shutil.rmtree(self.config_dir)
+
+    def test_config_round_trip(self):
+        config.write_config_file(self.quake_path, self.quake)
+        self.assertFalse(os.path.exists(self.quake_path))
+        self.assertTrue(config.config_file_exists(self.quake_path))
+        content = config.read_config_file(self.quake_path)
+        self.assertEqual(content, self.quake)
+        self.assertIs(type(content['game']['exe']), str)
+        self.assertTrue(config.remove_config_file(self.quake_path))
+        self.assertFalse(config.config_file_exists(self.quake_path))
+
+    def test_lossy_config_is_rejected(self):
+        self.assertRaises(ValueError, configstore.write_config,
+                          self.quake_path, {'game': {1: 'one'}})
+        self.assertRaises(ValueError, configstore.write_config,
+                          self.quake_path, {'game': {'ids': set([1])}})
+        self.assertFalse(configstore.has_config(self.quake_path))
+
+    def test_lossy_config_is_written_as_yaml(self):
+        config.write_config_file(self.quake_path, self.quake)
+        lossy_config = {'game': {1: 'one'}}
+        config.write_config_file(self.quake_path, lossy_config)
+        self.assertFalse(configstore.has_config(self.quake_path))
+        self.assertEqual(config.read_config_file(self.quake_path),
+                         lossy_config)
+        config.WRITER.flush()
+        self.assertEqual(config.read_yaml_from_file(self.quake_path),
+                         lossy_config)
+
+    def test_yaml_import_and_export(self):
+        config.write_yaml_to_file(self.quake_path, self.quake)
+        system_path = os.path.join(self.config_dir, 'system.yml')
+        config.write_yaml_to_file(system_path, {'system': {'game_path': '/'}})
+        self.assertEqual(config.import_config_store(), 2)
+        self.assertEqual(configstore.get_configs('game'),
+                         {'quake': self.quake})
+        os.remove(self.quake_path)
+        os.remove(system_path)
+        self.assertEqual(config.export_config_store(), 2)
+        self.assertEqual(config.read_yaml_from_file(self.quake_path),
+                         self.quake)
+        self.assertEqual(config.read_yaml_from_file(system_path),
+                         {'system': {'game_path': '/'}})
+
+    def test_option_queries(self):
+        config.write_config_file(self.quake_path, self.quake)
+        doom_path = os.path.join(self.config_dir, 'games/doom.yml')
+        config.write_config_file(doom_path, {'wine': {'version': '1.7.50'},
+                                             'system': {'terminal': False}})
+        self.assertEqual(configstore.find_configs('wine', 'version', '1.7.50'),
+                         ['doom', 'quake'])
+        self.assertEqual(configstore.find_configs('system', 'terminal', True),
+                         ['quake'])
+        self.assertEqual(configstore.get_option_values('system', 'terminal'),
+                         {'quake': True, 'doom': False})
+        config.write_config_file(self.quake_path, {'game': {}})
+        self.assertEqual(configstore.find_configs('wine', 'version', '1.7.50'),
+                         ['doom'])
+
+
 if __name__ == "__main__":
     lc = LutrisConfig(runner_slug="wine")
     logger.error("system level config : ")
@@ -1,7 +1,10 @@
+import json
 import unittest
 import os
+import sqlite3
+import tempfile
 from sqlite3 import IntegrityError, OperationalError
-from lutris import pga
+from lutris import cli, pga
 from lutris.util import sql
 
 TEST_PGA_PATH = os.path.join(os.path.dirname(__file__), 'pga.db')
@@ -10,11 +13,13 @@ TEST_PGA_PATH = os.path.join(os.path.dirname(__file__), 'pga.db')
 class DatabaseTester(unittest.TestCase):
     def setUp(self):
         pga.PGA_DB = TEST_PGA_PATH
+        sql.close_connections()
         if os.path.exists(TEST_PGA_PATH):
             os.remove(TEST_PGA_PATH)
         pga.syncdb()
 
     def tearDown(self):
+        sql.close_connections()
         if os.path.exists(TEST_PGA_PATH):
             os.remove(TEST_PGA_PATH)
 
@@ -48,6 +53,14 @@ class TestPersonnalGameArchive(DatabaseTester):
         self.assertEqual(len(game_list), 1)
         self.assertEqual(game_list[0]['name'], 'bang')
 
+    def test_can_filter_by_slugs(self):
+        pga.add_game(name="foobar", runner="Linux")
+        pga.add_game(name="bang", runner="Linux")
+        game_list = pga.get_games(slugs=set(['bang', 'foobar', 'missing']))
+        self.assertEqual([game['slug'] for game in game_list],
+                         ['bang', 'foobar'])
+        self.assertEqual(pga.get_games(slugs=[]), [])
+
     def test_can_filter_by_installed_games(self):
         pga.add_game(name="installed_game", runner="Linux", installed=1)
         pga.add_game(name="bang", runner="Linux", installed=0)
@@ -56,6 +69,31 @@ class TestPersonnalGameArchive(DatabaseTester):
         self.assertEqual(len(game_list), 1)
         self.assertEqual(game_list[0]['name'], 'installed_game')
 
+    def test_iter_games(self):
+        pga.add_game(name="installed_game", runner="Linux", installed=1)
+        games = list(pga.iter_games(columns=['slug', 'name'],
+                                    where={'installed': 1}))
+        self.assertEqual(len(games), 1)
+        self.assertEqual(games[0]['slug'], 'installed_game')
+        self.assertEqual(games[0].keys(), ['slug', 'name'])
+
+    def test_search_games(self):
+        pga.add_game(name="The Legend of Zelda", runner="snes9x")
+        pga.add_game(name="Zelda II", runner="Linux")
+        pga.add_game(name="Quake", runner="Linux")
+        self.assertEqual(set(pga.search_games("zel")),
+                         set(['the-legend-of-zelda', 'zelda-ii']))
+        self.assertEqual(pga.search_games("legend zel"),
+                         ['the-legend-of-zelda'])
+        self.assertEqual(len(pga.search_games("linux", limit=2)), 2)
+        self.assertEqual(pga.search_games("&"), [])
+
+    def test_search_index_is_updated(self):
+        pga.add_or_update(name="LutrisTest", runner="wine", slug="lutristest")
+        self.assertEqual(pga.search_games("wine"), ['lutristest'])
+        pga.delete_game("lutristest")
+        self.assertEqual(pga.search_games("lutris"), [])
+
     def test_game_with_same_slug_is_updated(self):
         pga.add_game(name="some game", runner="linux")
         game = pga.get_game_by_slug("some-game")
@@ -64,6 +102,81 @@ class TestPersonnalGameArchive(DatabaseTester):
         game = pga.get_game_by_slug("some-game")
         self.assertEqual(game['directory'], '/foo')
 
+    def test_upsert_games_bulk(self):
+        changed = pga.upsert_games_bulk([
+            {'slug': 'lutristest', 'name': 'LutrisTest', 'year': 2015},
+            {'slug': 'new-game', 'name': 'New game', 'year': 2014},
+        ])
+        self.assertEqual(changed, set(['lutristest', 'new-game']))
+        self.assertEqual(pga.get_table_length(), 2)
+        game = pga.get_game_by_slug('lutristest')
+        self.assertEqual(game['year'], 2015)
+        self.assertEqual(game['runner'], 'Linux')
+
+    def test_upsert_games_bulk_skips_unchanged_games(self):
+        games = [{'slug': 'lutristest', 'name': 'LutrisTest', 'year': 2015}]
+        pga.upsert_games_bulk(games)
+        self.assertEqual(pga.upsert_games_bulk(games), set())
+
+
+class TestGameCache(DatabaseTester):
+    def setUp(self):
+        super(TestGameCache, self).setUp()
+        pga.add_game(name="LutrisTest", runner="Linux",
+                     installer_slug="lutristest-installer")
+
+    def test_lookups_are_cached(self):
+        pga.get_game_by_slug('lutristest')
+        hits = pga.GAME_CACHE.hits
+        game = pga.get_game_by_slug('lutristest')
+        self.assertEqual(pga.GAME_CACHE.hits, hits + 1)
+        self.assertEqual(game['name'], 'LutrisTest')
+
+    def test_can_get_game_by_installer_slug(self):
+        game = pga.get_game_by_slug('lutristest-installer',
+                                    field='installer_slug')
+        self.assertEqual(game['slug'], 'lutristest')
+
+    def test_installer_slug_index_is_updated_by_writes(self):
+        pga.add_game(name="LutrisTest 2", runner="Linux",
+                     installer_slug="lutristest-installer")
+        pga.get_game_by_slug('lutristest')
+        pga.add_or_update(name="LutrisTest", runner="Linux",
+                          installer_slug="other-installer")
+        game = pga.get_game_by_slug('lutristest-installer',
+                                    field='installer_slug')
+        self.assertEqual(game['slug'], 'lutristest-2')
+        game = pga.get_game_by_slug('other-installer', field='installer_slug')
+        self.assertEqual(game['slug'], 'lutristest')
+        pga.delete_game('lutristest-2')
+        self.assertEqual(
+            pga.get_game_by_slug('lutristest-installer', 'installer_slug'), {}
+        )
+
+    def test_revalidate_sees_writes_of_other_processes(self):
+        pga.GAME_CACHE.load()
+        connection = sqlite3.connect(TEST_PGA_PATH)
+        with connection:
+            connection.execute("UPDATE games SET installed = 1")
+        connection.close()
+        self.assertFalse(pga.get_game_by_slug('lutristest')['installed'])
+        pga.GAME_CACHE.revalidate()
+        self.assertEqual(pga.get_game_by_slug('lutristest')['installed'], 1)
+
+    def test_cache_is_invalidated_by_writes(self):
+        pga.get_game_by_slug('lutristest')
+        pga.add_or_update(name="LutrisTest", runner="Linux",
+                          directory="/foo")
+        self.assertEqual(pga.get_game_by_slug('lutristest')['directory'],
+                         '/foo')
+        pga.set_uninstalled('lutristest')
+        self.assertEqual(pga.get_game_by_slug('lutristest')['runner'], '')
+        pga.delete_game('lutristest')
+        self.assertEqual(pga.get_game_by_slug('lutristest'), {})
+        self.assertEqual(
+            pga.get_game_by_slug('lutristest-installer', 'installer_slug'), {}
+        )
+
 
 class TestDbCreator(DatabaseTester):
     def test_can_generate_fields(self):
@@ -85,6 +198,36 @@ class TestDbCreator(DatabaseTester):
         self.assertEqual(results[0]['name'], "testok")
 
 
+class TestConnectionPool(DatabaseTester):
+    def test_connection_is_reused(self):
+        connection = sql.get_connection(TEST_PGA_PATH)
+        self.assertIs(sql.get_connection(TEST_PGA_PATH), connection)
+
+    def test_connection_is_reopened_when_file_is_removed(self):
+        connection = sql.get_connection(TEST_PGA_PATH)
+        os.remove(TEST_PGA_PATH)
+        self.assertIsNot(sql.get_connection(TEST_PGA_PATH), connection)
+
+    def test_uses_wal_journal(self):
+        connection = sql.get_connection(TEST_PGA_PATH)
+        journal_mode = connection.execute("PRAGMA journal_mode").fetchone()
+        self.assertEqual(journal_mode[0], 'wal')
+
+    def test_transaction_is_rolled_back_on_error(self):
+        with self.assertRaises(ValueError):
+            with sql.db_transaction(TEST_PGA_PATH):
+                pga.add_game(name="rolled back", runner="linux")
+                raise ValueError()
+        self.assertFalse(pga.get_game_by_slug("rolled-back"))
+
+    def test_nested_transactions_commit_once(self):
+        with sql.db_transaction(TEST_PGA_PATH):
+            pga.add_game(name="first", runner="linux")
+            with sql.db_transaction(TEST_PGA_PATH):
+                pga.add_game(name="second", runner="linux")
+        self.assertEqual(pga.get_table_length(), 2)
+
+
 class TestMigration(DatabaseTester):
     def setUp(self):
         super(TestMigration, self).setUp()
@@ -150,8 +293,92 @@ class TestMigration(DatabaseTester):
         self.assertEqual(schema[2]['name'], 'new_field')
         self.assertEqual(migrated, ['new_field'])
 
+    def test_can_create_index(self):
+        self.create_table()
+        pga.create_index(self.tablename, 'basetable_name', ['name'],
+                         unique=True)
+        sql.db_insert(TEST_PGA_PATH, self.tablename, {'name': "foo"})
+        with self.assertRaises(IntegrityError):
+            sql.db_insert(TEST_PGA_PATH, self.tablename, {'name': "foo"})
+
+    def test_sets_schema_version(self):
+        self.assertEqual(pga.get_schema_version(), pga.SCHEMA_VERSION)
+
+    def test_game_slugs_are_unique(self):
+        pga.add_game(name="some game", runner='linux')
+        with self.assertRaises(IntegrityError):
+            pga.add_game(name="some game", runner='linux')
+
+    def test_removes_duplicate_games(self):
+        with sql.db_cursor(TEST_PGA_PATH) as cursor:
+            cursor.execute("DROP INDEX games_slug")
+        pga.add_game(name="some game", runner='linux', installed=1)
+        pga.add_game(name="some game", runner='linux', installed=0)
+        pga.add_game(name="other game", runner='linux')
+        pga.set_schema_version(0)
+        pga.syncdb()
+        games = pga.get_games()
+        self.assertEqual(len(games), 2)
+        self.assertEqual(games[1]['slug'], 'some-game')
+        self.assertEqual(games[1]['installed'], 1)
+
+    def test_migrates_database_without_installed_column(self):
+        sql.close_connections()
+        os.remove(TEST_PGA_PATH)
+        with sql.db_cursor(TEST_PGA_PATH) as cursor:
+            cursor.execute("CREATE TABLE games (id INTEGER PRIMARY KEY, "
+                           "name TEXT, slug TEXT, runner TEXT, "
+                           "directory TEXT)")
+            cursor.executemany(
+                "INSERT INTO games (name, slug, runner, directory) "
+                "VALUES (?, ?, ?, ?)",
+                [("Quake", "quake", "linux", "/home"),
+                 ("Doom", "doom", "linux", ""),
+                 ("Quake", "quake", "linux", "")]
+            )
+        pga.syncdb()
+        self.assertEqual(pga.get_schema_version(), pga.SCHEMA_VERSION)
+        games = pga.get_games()
+        self.assertEqual([(game['slug'], game['installed'])
+                          for game in games],
+                         [('doom', None), ('quake', 1)])
+
     def test_does_set_installed_games(self):
         pga.add_game(name="some game", runner='linux', directory="/home")
         pga.set_installed_games()
         test_game = pga.get_games()[0]
         self.assertEqual(test_game['installed'], 1)
+
+
+class TestCommandLine(DatabaseTester):
+    def setUp(self):
+        super(TestCommandLine, self).setUp()
+        pga.add_game(name="Quake", runner="linux", installed=1)
+        pga.add_game(name="Quake II", runner="wine")
+
+    def test_list_games(self):
+        games = cli.list_games()
+        self.assertEqual([game['slug'] for game in games],
+                         ['quake', 'quake-ii'])
+        self.assertEqual(sorted(games[0].keys()), sorted(cli.GAME_COLUMNS))
+        games = cli.list_games(installed=True)
+        self.assertEqual([game['slug'] for game in games], ['quake'])
+        self.assertEqual(json.loads(cli.dump_json(games))[0]['name'], 'Quake')
+
+    def test_search_games(self):
+        games = cli.search_games('quake ii')
+        self.assertEqual([game['slug'] for game in games], ['quake-ii'])
+
+    def test_read_installer(self):
+        _fd, path = tempfile.mkstemp(suffix='.yml')
+        os.close(_fd)
+        try:
+            with open(path, 'w') as installer_file:
+                installer_file.write("name: Quake\ngame_slug: quake\n")
+            self.assertRaises(ValueError, cli.read_installer, path)
+            with open(path, 'a') as installer_file:
+                installer_file.write("runner: linux\n")
+            scripts = cli.read_installer(path)
+            self.assertEqual(scripts[0]['game_slug'], 'quake')
+        finally:
+            os.remove(path)
@@ -1,4 +1,15 @@
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
 from unittest import TestCase
+from lutris import shortcuts
+from lutris.gui import imageloader
+from lutris.gui import pixbufcache
+from lutris.util import persistence
+from lutris.util import startup
 from lutris.util import system
 from lutris.util import steam
 from lutris.util import strings
@@ -32,6 +43,56 @@ class TestFileUtils(TestCase):
         self.assertEqual(system.substitute(fileid, _files), "/foo/bar")
 
 
+class TestExecutableResolver(TestCase):
+    def setUp(self):
+        self.bin_dirs = [tempfile.mkdtemp(), tempfile.mkdtemp()]
+        self.old_path = os.environ.get('PATH')
+        os.environ['PATH'] = os.pathsep.join(self.bin_dirs)
+        self.resolver = system.ExecutableResolver()
+        self.add_file(0, 'xterm')
+        self.add_file(0, 'README', mode=0o644)
+        self.add_file(1, 'README')
+
+    def tearDown(self):
+        os.environ['PATH'] = self.old_path
+        for bin_dir in self.bin_dirs:
+            shutil.rmtree(bin_dir)
+
+    def add_file(self, index, name, mode=0o755):
+        path = os.path.join(self.bin_dirs[index], name)
+        open(path, 'w').close()
+        os.chmod(path, mode)
+        # Make sure the directory looks modified on coarse mtime filesystems
+        os.utime(self.bin_dirs[index], (0, time.time() + index + 1))
+        return path
+
+    def test_find(self):
+        self.assertEqual(self.resolver.find('xterm'),
+                         os.path.join(self.bin_dirs[0], 'xterm'))
+        self.assertEqual(self.resolver.find('README'),
+                         os.path.join(self.bin_dirs[1], 'README'))
+        self.assertIsNone(self.resolver.find('konsole'))
+
+    def test_find_all(self):
+        self.assertEqual(self.resolver.find_all(['xterm', 'README', 'st']), {
+            'xterm': os.path.join(self.bin_dirs[0], 'xterm'),
+            'README': os.path.join(self.bin_dirs[1], 'README'),
+            'st': None,
+        })
+
+    def test_cache_is_invalidated(self):
+        self.assertIsNone(self.resolver.find('konsole'))
+        konsole_path = self.add_file(1, 'konsole')
+        self.assertEqual(self.resolver.find('konsole'), konsole_path)
+        os.environ['PATH'] = self.bin_dirs[0]
+        self.assertIsNone(self.resolver.find('konsole'))
+
+    def test_find_executable_returns_an_empty_string_when_missing(self):
+        self.assertEqual(system.find_executable('xterm'),
+                         os.path.join(self.bin_dirs[0], 'xterm'))
+        self.assertEqual(system.find_executable('konsole'), '')
+
+
 class TestSteamUtils(TestCase):
     def test_dict_to_vdf(self):
         dict_data = {
@@ -58,7 +119,74 @@ class TestSteamUtils(TestCase):
         self.assertEqual(vdf_data.strip(), expected_vdf.strip())
 
 
+class TestSteamappsIndex(TestCase):
+    def setUp(self):
+        _fd, self.path = tempfile.mkstemp(suffix='.acf')
+        os.close(_fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def write_appmanifest(self, last_owner, mtime):
+        with open(self.path, 'w') as appmanifest:
+            appmanifest.write('"AppState"\n{\n\t"LastOwner"\t"%s"\n}\n'
+                              % last_owner)
+        os.utime(self.path, (mtime, mtime))
+
+    def test_appmanifests_are_parsed_when_changed(self):
+        from lutris import sync
+        self.write_appmanifest('0', 1000)
+        self.assertFalse(sync.is_steamapp_installed(self.path))
+        self.assertEqual(sync._steamapps_index[self.path], (1000, False))
+        self.write_appmanifest('76561197960287930', 2000)
+        self.assertTrue(sync.is_steamapp_installed(self.path))
+
+
+class TestLauncherIndex(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.index = shortcuts.LauncherIndex()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_directory_is_listed_again_when_changed(self):
+        self.assertFalse(self.index.exists(self.tmp_dir, 'quake.desktop'))
+        open(os.path.join(self.tmp_dir, 'quake.desktop'), 'w').close()
+        # Make sure the modification time changes
+        os.utime(self.tmp_dir, (0, 0))
+        self.assertTrue(self.index.exists(self.tmp_dir, 'quake.desktop'))
+        self.index.update(self.tmp_dir, 'quake.desktop', False)
+        self.assertFalse(self.index.exists(self.tmp_dir, 'quake.desktop'))
+
+    def test_missing_directory(self):
+        missing_dir = os.path.join(self.tmp_dir, 'missing')
+        self.assertFalse(self.index.exists(missing_dir, 'quake.desktop'))
+
+
 class TestStringUtils(TestCase):
+    def test_get_sort_key(self):
+        names = ["Doom 10", "the Dig", "doom 2", "Doom", "Dune II"]
+        self.assertEqual(sorted(names, key=strings.get_sort_key),
+                         ["Doom", "doom 2", "Doom 10", "Dune II", "the Dig"])
+        self.assertEqual(
+            sorted(names, key=lambda name: strings.get_sort_key(name, True)),
+            ["the Dig", "Doom", "doom 2", "Doom 10", "Dune II"]
+        )
+        self.assertEqual(strings.get_sort_key("The", True), "the")
+
+    def test_get_search_key(self):
+        self.assertEqual(strings.get_search_key("Half-Life 2"), "half life 2")
+        self.assertEqual(strings.get_search_key(u"Pok\xe9mon: Snap"),
+                         "pokemon snap")
+        self.assertEqual(strings.get_search_key("Pok\xc3\xa9mon"), "pokemon")
+        self.assertEqual(strings.get_search_key(u"\u30bc\u30eb\u30c0!"),
+                         u"\u30bc\u30eb\u30c0".encode('UTF-8'))
+        self.assertEqual(strings.get_search_key(u"\u0422\u0435\u0442\u0440"),
+                         u"\u0442\u0435\u0442\u0440".encode('UTF-8'))
+        self.assertEqual(strings.slugify("Pok\xc3\xa9mon: Snap"),
+                         "pokemon-snap")
+
     def test_add_url_tags(self):
         self.assertEqual(strings.add_url_tags("foo bar"), "foo bar")
         self.assertEqual(
@@ -75,3 +203,151 @@ class TestStringUtils(TestCase):
             'bar <a href="http://strycore.com">http://strycore.com</a>'
         )
         self.assertEqual(strings.add_url_tags(text), expected)
+
+
+class TestWriteBehind(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'lutris.conf')
+        self.writer = persistence.WriteBehind(delay=0.05)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def read(self):
+        with open(self.path) as config_file:
+            return config_file.read()
+
+    def test_writes_are_merged(self):
+        for width in range(10):
+            self.writer.schedule(self.path, 'width = %d' % width)
+        self.assertFalse(os.path.exists(self.path))
+        self.assertEqual(self.writer.get_pending(self.path), 'width = 9')
+        time.sleep(0.2)
+        self.assertEqual(self.read(), 'width = 9')
+        self.assertEqual(self.writer.get_stats(), {
+            'scheduled': 10, 'written': 1, 'pending': 0, 'saved': 9
+        })
+
+    def test_flush_and_cancel(self):
+        self.writer.schedule(self.path, ['a', 'b'], serialize=' '.join)
+        self.writer.flush()
+        self.assertEqual(self.read(), 'a b')
+        self.writer.schedule(self.path, 'c')
+        self.writer.cancel(self.path)
+        time.sleep(0.2)
+        self.assertEqual(self.read(), 'a b')
+        self.assertEqual(os.listdir(self.tmp_dir), ['lutris.conf'])
+
+    def test_failed_writes_stay_pending(self):
+        path = os.path.join(self.tmp_dir, 'missing', 'lutris.conf')
+        self.writer.schedule(path, 'width = 800')
+        self.writer.flush()
+        self.assertEqual(self.writer.get_pending(path), 'width = 800')
+        self.assertEqual(self.writer.get_stats()['written'], 0)
+        os.mkdir(os.path.dirname(path))
+        self.writer.flush()
+        self.assertFalse(self.writer.is_pending(path))
+        with open(path) as config_file:
+            self.assertEqual(config_file.read(), 'width = 800')
+        self.assertEqual(self.writer.get_stats(), {
+            'scheduled': 1, 'written': 1, 'pending': 0, 'saved': 0
+        })
+
+
+class TestPixbufCache(TestCase):
+    def setUp(self):
+        self.cache = pixbufcache.PixbufCache(max_size=100)
+
+    def test_least_recently_used_are_evicted(self):
+        self.cache.set(('quake', 'banner'), 'quake banner', size=40)
+        self.cache.set(('doom', 'banner'), 'doom banner', size=40)
+        self.assertEqual(self.cache.get(('quake', 'banner')), 'quake banner')
+        self.cache.set(('hexen', 'banner'), 'hexen banner', size=40)
+        self.assertEqual(self.cache.get(('doom', 'banner')), None)
+        self.assertEqual(self.cache.get(('quake', 'banner')), 'quake banner')
+        stats = self.cache.get_stats()
+        self.assertEqual(stats['evictions'], 1)
+        self.assertEqual(stats['entries'], 2)
+        self.assertEqual(stats['size'], 80)
+        self.assertEqual((stats['hits'], stats['misses']), (2, 1))
+
+    def test_invalidate_game(self):
+        self.cache.set(('quake', 'banner', True), 'quake banner', size=10)
+        self.cache.set(('quake', 'icon', False), 'quake icon', size=10)
+        self.cache.set(('doom', 'icon', True), 'doom icon', size=10)
+        self.cache.invalidate('quake')
+        self.assertEqual(self.cache.get(('quake', 'icon', False)), None)
+        self.assertEqual(self.cache.get(('doom', 'icon', True)), 'doom icon')
+        self.assertEqual(self.cache.get_stats()['size'], 10)
+
+    def test_oversized_pixbufs_are_not_cached(self):
+        self.cache.set(('quake', 'banner'), 'quake banner', size=101)
+        self.assertEqual(self.cache.get_stats()['entries'], 0)
+
+
+class TestImageLoader(TestCase):
+    def setUp(self):
+        self.loaded = []
+        self.release = threading.Event()
+        self.loader = imageloader.ImageLoader(self.load, self.loaded.extend,
+                                              workers=1)
+
+    def tearDown(self):
+        self.loader.stop()
+
+    def load(self, game_slug):
+        self.release.wait()
+        return game_slug.upper()
+
+    def wait_results(self, count):
+        for _ in range(100):
+            if len(self.loader.results) >= count:
+                return
+            time.sleep(0.01)
+
+    def test_results_are_delivered_in_batches(self):
+        self.release.set()
+        for game_slug in ('quake', 'doom'):
+            self.loader.request(game_slug, game_slug)
+        self.wait_results(2)
+        self.assertEqual(self.loaded, [])
+        self.loader.deliver()
+        self.assertEqual(self.loaded, [('quake', ('quake', ), 'QUAKE'),
+                                       ('doom', ('doom', ), 'DOOM')])
+
+
+class TestStartupProfiler(TestCase):
+    def test_parse_budget(self):
+        self.assertEqual(startup.parse_budget('1500'), {'total': 1500})
+        self.assertEqual(startup.parse_budget('total=900, syncdb=20'),
+                         {'total': 900, 'syncdb': 20})
+        self.assertRaises(ValueError, startup.parse_budget, 'syncdb=fast')
+
+    def test_phases_and_imports_are_measured(self):
+        profiler = startup.StartupProfiler()
+        with profiler.phase('ignored'):
+            pass
+        sys.modules.pop('colorsys', None)
+        profiler.start()
+        try:
+            with profiler.phase('syncdb'):
+                import colorsys  # noqa
+                time.sleep(0.02)
+        finally:
+            profiler.stop()
+        self.assertEqual([phase[0] for phase in profiler.phases], ['syncdb'])
+        self.assertIn('colorsys', profiler.imports)
+        self.assertEqual(profiler.check_budget({'syncdb': 10000}), [])
+        exceeded = profiler.check_budget({'syncdb': 1, 'total': 10000})
+        self.assertEqual([item[0] for item in exceeded], ['syncdb'])
+        self.assertIn('EXCEEDED', profiler.get_report({'syncdb': 1}))
+
+    def test_phases_measured_elsewhere_are_added(self):
+        profiler = startup.StartupProfiler()
+        profiler.add_phase('ignored', 1)
+        profiler.start()
+        profiler.add_phase('view_fill', 0.25)
+        profiler.stop()
+        self.assertEqual(profiler.phases, [('view_fill', 0.25)])
+        self.assertEqual(profiler.get_durations()['view_fill'], 250)